@@ -44,7 +44,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tasks.middleware.MetricsMiddleware',
+    'tasks.middleware.ProfilingMiddleware',
+    'tasks.middleware.SlowQueryLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'tasks.middleware.PrecompressedStaticMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -57,7 +61,7 @@ ROOT_URLCONF = 'task_manager.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'tasks.profiling.ProfiledDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -130,6 +134,43 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# collectstatic bundles ASSET_BUNDLES and writes .gz/.br copies of text files
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'tasks.storage.BundledStaticFilesStorage'},
+}
+
+# Seconds browsers may cache static files without a content hash in their name
+STATIC_MAX_AGE = 3600
+
+# Third party files downloaded into static/ by the vendor_assets command, with their source and integrity
+VENDOR_ASSETS = {
+    'vendor/bootstrap/bootstrap.min.css': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css',
+        'sha384-1BmE4kWBq78iYhFldvKuhfTAU6auU8tT94WrHftjDbrCEXSU1oBoqyl2QvZ6jIW3',
+    ),
+    'vendor/popper/popper.min.js': (
+        'https://cdn.jsdelivr.net/npm/@popperjs/core@2.10.2/dist/umd/popper.min.js',
+        'sha384-7+zCNj/IqJ95wo16oMtfsKbZ9ccEh31eOz1HGyDuCQ6wgnyJNSYdrPa03rtR1zdB',
+    ),
+    'vendor/bootstrap/bootstrap.min.js': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.min.js',
+        'sha384-QJHtvGhmr9XOIpI6YVutG+2QOK9T+ZnN4kzFN1RtK3zEFEIsxhlmWl5/YESvpZ13',
+    ),
+}
+
+# Static files concatenated and minified into one content-hashed file each by collectstatic
+ASSET_BUNDLES = {
+    'bundles/app.css': [
+        'vendor/bootstrap/bootstrap.min.css',
+        'custom.css',
+    ],
+    'bundles/app.js': [
+        'vendor/popper/popper.min.js',
+        'vendor/bootstrap/bootstrap.min.js',
+    ],
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -148,3 +189,78 @@ REDIRECT_URL_WHEN_LOGGED_IN = 'dashboard'
 MESSAGE_TAGS = {
     messages.ERROR: 'danger',
 }
+
+# Number of tasks shown per page on the dashboard, team page and task search
+TASKS_PAGE_SIZE = 50
+
+# Number of audit log entries kept for each team
+AUDIT_LOG_RETENTION = 20
+
+# Queue audit log entries after commit and write them in batches from a background thread
+AUDIT_LOG_BUFFERED = False
+AUDIT_LOG_BATCH_SIZE = 100
+AUDIT_LOG_FLUSH_INTERVAL = 1.0
+
+# Seconds a user's rendered dashboard teams and invites panels stay cached
+DASHBOARD_PANEL_CACHE_TIMEOUT = 600
+
+# Where avatars come from: 'gravatar' or 'identicon' to render them locally
+AVATAR_MODE = 'gravatar'
+
+# Directory holding the rendered identicons of users, at the sizes the templates use
+AVATAR_CACHE_DIR = os.path.join(BASE_DIR, 'avatar_cache')
+
+# Static images to generate resized variants of, with the widths wanted
+IMAGE_VARIANTS = {
+    'images/task_manager_icon_largest.png': [50, 64, 100, 150],
+    'images/main-background.jpg': [768, 1280, 1920, 2560],
+}
+
+# Formats generated besides each image's PNG or JPEG fallback
+IMAGE_VARIANT_FORMATS = ['avif', 'webp']
+
+# Directory holding the generated image variants and their manifest
+IMAGE_VARIANTS_DIR = os.path.join(BASE_DIR, 'image_variants')
+
+# Report the time spent on each request, in SQL and in templates, and its cache lookups in a
+# Server-Timing header, which anyone can read, so only for development and trusted clients
+PROFILING = False
+
+# Also log each request's timings as a line of JSON to the tasks.profiling logger
+PROFILING_LOG = False
+
+# Record Prometheus metrics of every request and serve them at /metrics/. With several worker
+# processes, also set PROMETHEUS_MULTIPROC_DIR in the server's environment, see tasks/metrics.py
+METRICS_ENABLED = False
+
+# Addresses allowed to read the metrics besides staff users. Behind a proxy every request
+# comes from the proxy's address, so remove it from here if it forwards /metrics/
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Log each SQL statement taking at least this many milliseconds, or None not to
+SLOW_QUERY_THRESHOLD_MS = None
+
+# File the slow statements are logged to as lines of JSON, with up to SLOW_QUERY_LOG_BACKUPS rotated copies
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'slow_queries.jsonl')
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'maxBytes': SLOW_QUERY_LOG_MAX_BYTES,
+            'backupCount': SLOW_QUERY_LOG_BACKUPS,
+            # The file is only created once a slow statement is logged
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'tasks.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'tasks.slow_queries': {'handlers': ['slow_queries'], 'level': 'WARNING', 'propagate': False},
+    },
+}
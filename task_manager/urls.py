@@ -15,7 +15,7 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 from tasks import views
 
 urlpatterns = [
@@ -42,4 +42,7 @@ urlpatterns = [
     path('leave_team/<int:team_id>/', views.leave_team, name = 'leave_team'),
     path('remove_member/<int:team_id>/<str:username>/', views.remove_member, name = 'remove_member'),
     path('audit_log/<int:team_id>/', views.audit_log, name = 'audit_log'),
+    path('image_variants/<path:path>', views.image_variant, name = 'image_variant'),
+    path('metrics/', views.metrics, name = 'metrics'),
+    re_path(r'^avatar/(?P<email_hash>[0-9a-f]{32})/(?P<size>[0-9]+)\.png$', views.avatar, name = 'avatar'),
 ]
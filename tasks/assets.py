@@ -0,0 +1,151 @@
+"""Bundling, minification and precompression of the CSS and JavaScript in the static files."""
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+from functools import lru_cache
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BUNDLE_MANIFEST_NAME = 'bundles.json'
+
+# Text formats worth compressing; images and fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.svg', '.txt', '.map')
+
+# Names containing a content hash, such as bundles/app.0123456789ab.css
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[A-Za-z0-9]+$')
+
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+SOURCE_MAP_COMMENT = re.compile(r'^//# sourceMappingURL=.*$', re.MULTILINE)
+
+
+def minify_css(css):
+    """Return css without comments and redundant whitespace."""
+
+    css = CSS_COMMENT.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def rewrite_css_urls(css, source, bundle):
+    """Make the relative url()s of css, which lives at source, point at the same files from bundle."""
+
+    def rewrite(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        path = posixpath.normpath(posixpath.join(posixpath.dirname(source), url))
+        return f'url({quote}{posixpath.relpath(path, posixpath.dirname(bundle))}{quote})'
+
+    return CSS_URL.sub(rewrite, css)
+
+
+def read_static(storage, name):
+    with storage.open(name) as static_file:
+        return static_file.read().decode('utf-8')
+
+
+def build_bundle(storage, bundle, parts):
+    """Concatenate and minify the parts of a bundle into a content-hashed file and return its name."""
+
+    contents = []
+    for part in parts:
+        content = read_static(storage, part)
+        if bundle.endswith('.css'):
+            content = minify_css(rewrite_css_urls(content, part, bundle))
+        else:
+            content = SOURCE_MAP_COMMENT.sub('', content).strip()
+        contents.append(content)
+
+    data = ('\n' if bundle.endswith('.css') else ';\n').join(contents).encode('utf-8')
+    name, extension = posixpath.splitext(bundle)
+    hashed_name = f'{name}.{hashlib.sha256(data).hexdigest()[:12]}{extension}'
+    if storage.exists(hashed_name):
+        storage.delete(hashed_name)
+    storage.save(hashed_name, ContentFile(data))
+    return hashed_name
+
+
+def compress_static(storage, name):
+    """Write .gz and, when brotli is installed, .br copies of a static file next to it.
+
+    Returns the names written, skipping encodings that do not make the file
+    smaller and copies that are already newer than the file.
+    """
+
+    encodings = [('.gz', lambda data: gzip.compress(data, 9, mtime = 0))]
+    if brotli is not None:
+        encodings.append(('.br', lambda data: brotli.compress(data, quality = 11)))
+    modified = storage.get_modified_time(name)
+    encodings = [
+        (suffix, compress) for suffix, compress in encodings
+        if not storage.exists(name + suffix) or storage.get_modified_time(name + suffix) < modified
+    ]
+    if not encodings:
+        return []
+
+    with storage.open(name) as static_file:
+        data = static_file.read()
+
+    written = []
+    for suffix, compress in encodings:
+        compressed = compress(data)
+        if len(compressed) >= len(data):
+            continue
+        if storage.exists(name + suffix):
+            storage.delete(name + suffix)
+        storage.save(name + suffix, ContentFile(compressed))
+        written.append(name + suffix)
+    return written
+
+
+_bundle_manifest = (None, {})
+
+def load_bundle_manifest():
+    """Return the bundles written by collectstatic, reloading them only when the file has changed."""
+
+    global _bundle_manifest
+    if not settings.STATIC_ROOT:
+        return {}
+    path = os.path.join(settings.STATIC_ROOT, BUNDLE_MANIFEST_NAME)
+    try:
+        modified = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    if _bundle_manifest[0] != (path, modified):
+        with open(path) as manifest:
+            _bundle_manifest = ((path, modified), json.load(manifest))
+    return _bundle_manifest[1]
+
+
+@lru_cache(maxsize = None)
+def is_vendored(part):
+    """Return whether a vendor file has been downloaded into the static files."""
+
+    return finders.find(part) is not None
+
+
+def bundle_parts(bundle):
+    """Return (static path, CDN URL, integrity) for each part of a bundle that has not been built.
+
+    The CDN URL and integrity are None for parts found in the static files.
+    """
+
+    parts = []
+    for part in settings.ASSET_BUNDLES[bundle]:
+        if part in settings.VENDOR_ASSETS and not is_vendored(part):
+            url, integrity = settings.VENDOR_ASSETS[part]
+            parts.append((part, url, integrity))
+        else:
+            parts.append((part, None, None))
+    return parts
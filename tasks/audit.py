@@ -0,0 +1,129 @@
+"""Writing of audit log entries, either directly or buffered in a background thread."""
+import atexit
+import logging
+import os
+import threading
+from django.conf import settings
+from django.db import connection, connections, transaction
+from .metrics import AUDIT_LOG_WRITES
+from .models import AuditLog, Team, User
+
+logger = logging.getLogger(__name__)
+
+
+def write_audit_logs(entries):
+    """Save unsaved AuditLog entries, keeping only each team's newest AUDIT_LOG_RETENTION entries.
+
+    Entries whose team or user was deleted since they were queued are dropped,
+    as a single one would make the whole batch fail its foreign key checks.
+    """
+
+    with transaction.atomic():
+        teams = Team.objects.filter(team_id__in = {entry.team_id for entry in entries})
+        if connection.features.has_select_for_update:
+            # Lock the teams so concurrent writers prune their logs one at a time
+            teams = teams.select_for_update()
+        team_ids = sorted(teams.values_list('team_id', flat = True))
+        user_ids = set(User.objects.filter(id__in = {entry.username_id for entry in entries}).values_list('id', flat = True))
+        entries = [entry for entry in entries if entry.team_id in team_ids and entry.username_id in user_ids]
+
+        AuditLog.objects.bulk_create(entries)
+
+        for team_id in team_ids:
+            # Delete every entry older than the newest AUDIT_LOG_RETENTION in a single statement
+            expired_logs = AuditLog.objects.filter(team_id = team_id).order_by('-id').values('id')[settings.AUDIT_LOG_RETENTION:]
+            AuditLog.objects.filter(team_id = team_id, id__in = expired_logs).delete()
+    AUDIT_LOG_WRITES.inc(len(entries))
+
+
+class AuditLogWriter:
+    """Queue audit log entries in memory and write them in batches from a background thread.
+
+    Entries are only queued once the transaction that produced them commits.
+    A batch is written when batch_size entries are waiting or flush_interval
+    seconds have passed, and whatever is left is written when the process exits.
+    """
+
+    def __init__(self, batch_size = 100, flush_interval = 1.0, background = True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.background = background
+        self._queue = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._pid = None
+
+    def add(self, entry):
+        """Queue an unsaved AuditLog entry after the current transaction commits."""
+
+        transaction.on_commit(lambda: self._enqueue(entry))
+
+    def _enqueue(self, entry):
+        with self._lock:
+            self._queue.append(entry)
+            queued = len(self._queue)
+            if self.background:
+                self._ensure_thread()
+        if queued >= self.batch_size:
+            self._wake.set()
+
+    def _ensure_thread(self):
+        # A forked worker inherits the queue but not the thread, so start one per process
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target = self._run, name = 'audit-log-writer', daemon = True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stopping:
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                self.flush()
+        finally:
+            connections.close_all()
+
+    def flush(self):
+        """Write every queued entry now."""
+
+        with self._lock:
+            batch, self._queue = self._queue, []
+        for start in range(0, len(batch), self.batch_size):
+            entries = batch[start:start + self.batch_size]
+            try:
+                write_audit_logs(entries)
+            except Exception:
+                logger.exception('Could not write %d audit log entries', len(entries))
+
+    def stop(self):
+        """Stop the background thread and write any remaining entries."""
+
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout = 10)
+        self.flush()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_audit_writer():
+    """Return the process-wide AuditLogWriter, creating it on first use."""
+
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AuditLogWriter(settings.AUDIT_LOG_BATCH_SIZE, settings.AUDIT_LOG_FLUSH_INTERVAL)
+            atexit.register(_writer.stop)
+    return _writer
+
+def record_audit_log(entry):
+    """Save an unsaved AuditLog entry now, or queue it when AUDIT_LOG_BUFFERED is enabled."""
+
+    if settings.AUDIT_LOG_BUFFERED:
+        get_audit_writer().add(entry)
+    else:
+        write_audit_logs([entry])
@@ -0,0 +1,108 @@
+"""Identicon avatars rendered from a user's email hash and cached on disk."""
+import colorsys
+import os
+import struct
+import tempfile
+import zlib
+from django.conf import settings
+from tasks.models import User
+
+MIN_SIZE = 16
+MAX_SIZE = 512
+# Sizes linked to by User.gravatar and User.mini_gravatar, the only ones cached on disk
+CACHED_SIZES = (60, 120)
+GRID = 5
+BACKGROUND = (240, 240, 240)
+
+
+def identicon_colour(email_hash):
+    """Return the (r, g, b) foreground colour of an identicon."""
+
+    hue = int(email_hash[-7:], 16) / 0xFFFFFFF
+    red, green, blue = colorsys.hls_to_rgb(hue, 0.5, 0.6)
+    return round(red * 255), round(green * 255), round(blue * 255)
+
+
+def identicon_cells(email_hash):
+    """Return a GRID x GRID list of rows saying which cells are filled, mirrored left to right."""
+
+    half = (GRID + 1) // 2
+    rows = [[False] * GRID for _ in range(GRID)]
+    for column in range(half):
+        for row in range(GRID):
+            filled = int(email_hash[column * GRID + row], 16) % 2 == 0
+            rows[row][column] = rows[row][GRID - 1 - column] = filled
+    return rows
+
+
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def render_identicon(email_hash, size):
+    """Return the PNG bytes of a size x size identicon for an email hash."""
+
+    cell = size // (GRID + 1)
+    margin = (size - cell * GRID) // 2
+    foreground = bytes(identicon_colour(email_hash))
+    background = bytes(BACKGROUND)
+
+    blank_row = b'\x00' + background * size
+    scanlines = [blank_row] * margin
+    for cells in identicon_cells(email_hash):
+        pixels = background * margin
+        for filled in cells:
+            pixels += (foreground if filled else background) * cell
+        pixels += background * (size - margin - cell * GRID)
+        scanlines += [b'\x00' + pixels] * cell
+    scanlines += [blank_row] * (size - len(scanlines))
+
+    header = struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0)
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + _png_chunk(b'IHDR', header)
+        + _png_chunk(b'IDAT', zlib.compress(b''.join(scanlines), 9))
+        + _png_chunk(b'IEND', b'')
+    )
+
+
+def identicon_path(email_hash, size):
+    """Return where the identicon for an email hash and size is cached."""
+
+    return os.path.join(settings.AVATAR_CACHE_DIR, email_hash[:2], f'{email_hash}-{size}.png')
+
+
+def is_cacheable(email_hash, size):
+    """Return whether an identicon may be cached on disk: one of CACHED_SIZES for a user's email hash.
+
+    Anyone can request an avatar, so caching every hash and size asked for would let them fill the disk.
+    """
+
+    return size in CACHED_SIZES and User.objects.filter(email_hash = email_hash).exists()
+
+
+def get_identicon(email_hash, size):
+    """Return the PNG bytes of an identicon, rendering it and caching it on first use if it is cacheable."""
+
+    path = identicon_path(email_hash, size)
+    try:
+        with open(path, 'rb') as image:
+            return image.read()
+    except FileNotFoundError:
+        pass
+
+    data = render_identicon(email_hash, size)
+    if not is_cacheable(email_hash, size):
+        return data
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok = True)
+    # Write to a temporary file first so concurrent requests never read a partial image
+    descriptor, temporary_path = tempfile.mkstemp(dir = directory, suffix = '.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as image:
+            image.write(data)
+        os.replace(temporary_path, path)
+    except OSError:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+    return data
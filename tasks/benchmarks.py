@@ -0,0 +1,61 @@
+"""Timing of benchmarked requests and their queries, and comparison of the results with a saved baseline."""
+import math
+import time
+
+
+class QueryTimer:
+    """Database execute wrapper counting the queries run and the seconds spent in them."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of a list of values."""
+
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(samples):
+    """Summarise the (seconds, query count, SQL seconds, response bytes) samples of a view."""
+
+    times = [seconds * 1000 for seconds, _, _, _ in samples]
+    return {
+        'requests': len(samples),
+        'p50_ms': round(percentile(times, 50), 3),
+        'p95_ms': round(percentile(times, 95), 3),
+        'p99_ms': round(percentile(times, 99), 3),
+        'queries': round(sum(queries for _, queries, _, _ in samples) / len(samples), 2),
+        'sql_ms': round(sum(sql * 1000 for _, _, sql, _ in samples) / len(samples), 3),
+        'bytes': round(sum(size for _, _, _, size in samples) / len(samples)),
+    }
+
+
+def find_regressions(views, baseline, threshold):
+    """Return a description of each view that got slower than its baseline by more than threshold, or made more queries.
+
+    Query counts do not vary between runs on the same dataset, so any
+    increase is a regression. Views missing from the baseline are skipped.
+    """
+
+    regressions = []
+    for view, stats in views.items():
+        old = baseline.get(view)
+        if old is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if stats[metric] > old[metric] * (1 + threshold):
+                regressions.append(f'{view}: {metric} {old[metric]} -> {stats[metric]}')
+        if stats['queries'] > old['queries']:
+            regressions.append(f"{view}: queries {old['queries']} -> {stats['queries']}")
+    return regressions
@@ -0,0 +1,64 @@
+"""Per-user caching of the dashboard's teams and invites panels."""
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+HITS_KEY = 'dashboard_panels:hits'
+MISSES_KEY = 'dashboard_panels:misses'
+
+def _version_key(user_id):
+    return f'dashboard_panels:version:{user_id}'
+
+def get_dashboard_version(user_id):
+    """Return the current version of a user's dashboard panels."""
+
+    key = _version_key(user_id)
+    # Start from the current time so a version lost from the cache is never reused
+    cache.add(key, time.time_ns(), None)
+    return cache.get(key)
+
+def bump_dashboard_version(*user_ids):
+    """Invalidate the cached dashboard panels of the given users."""
+
+    for user_id in user_ids:
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.set(_version_key(user_id), time.time_ns(), None)
+
+def _count(key):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+def dashboard_panel_stats():
+    """Return how many times the dashboard panels were served from the cache or rendered."""
+
+    return {'hits': cache.get(HITS_KEY, 0), 'misses': cache.get(MISSES_KEY, 0)}
+
+def render_dashboard_panels(request, context):
+    """Return the teams and invites panels for request.user, rendering them only when their version changed.
+
+    context is only evaluated on a cache miss, so querysets passed in are not run on a hit.
+    """
+
+    # Cached forms embed a CSRF token, so they are only reused while the CSRF secret is unchanged
+    get_token(request)
+    csrf_digest = hashlib.sha256(request.META.get('CSRF_COOKIE', '').encode()).hexdigest()[:16]
+    version = get_dashboard_version(request.user.pk)
+    key = f'dashboard_panels:{request.user.pk}:{version}:{csrf_digest}'
+
+    html = cache.get(key)
+    if html is None:
+        _count(MISSES_KEY)
+        html = render_to_string('partials/dashboard_panels.html', context, request)
+        cache.set(key, str(html), settings.DASHBOARD_PANEL_CACHE_TIMEOUT)
+    else:
+        _count(HITS_KEY)
+    return mark_safe(html)
@@ -4,6 +4,7 @@ from django.contrib.auth import authenticate
 from django.core.validators import RegexValidator
 import datetime
 from django.core.validators import MinValueValidator
+from .caching import bump_dashboard_version
 from .models import User,Team,Invites, Task
 
 class LogInForm(forms.Form):
@@ -182,6 +183,7 @@ class InviteForm(forms.Form):
         # Handle the case where the form is not valid
             return
         usernames = self.getUsernames()
+        invited_users = []
         for username in usernames:
             try:
                 user = User.objects.get(username=username)
@@ -192,6 +194,9 @@ class InviteForm(forms.Form):
                 username = user,
                 team_id = self.team_id,
             )
+            invited_users.append(user.pk)
+        Team.bump_revision(self.team_id)
+        bump_dashboard_version(*invited_users)
 
 
 
@@ -1,5 +1,8 @@
+from functools import wraps
 from django.conf import settings
+from django.db.models import Exists, OuterRef
 from django.shortcuts import redirect
+from .models import Task, Team
 
 def login_prohibited(view_function):
     """Decorator for view functions that redirect users away if they are logged in."""
@@ -9,4 +12,62 @@ def login_prohibited(view_function):
             return redirect(settings.REDIRECT_URL_WHEN_LOGGED_IN)
         else:
             return view_function(request)
-    return modified_view_function
\ No newline at end of file
+    return modified_view_function
+
+def get_team_access(request, team_id):
+    """Return the team annotated with is_member for the current user, or None if it doesn't exist.
+
+    The team is loaded with a single query and remembered for the rest of the request.
+    """
+
+    teams = request.__dict__.setdefault('_team_access', {})
+    if team_id not in teams:
+        memberships = Team.team_members.through.objects.filter(team_id = OuterRef('pk'), user_id = request.user.pk)
+        teams[team_id] = (Team.objects
+            .select_related('team_leader')
+            .annotate(is_member = Exists(memberships))
+            .filter(team_id = team_id)
+            .first())
+    return teams[team_id]
+
+def get_task_access(request, task_id):
+    """Return the task annotated with is_member, is_assignee and can_edit for the current user, or None if it doesn't exist.
+
+    The task and its team are loaded with a single query and remembered for the rest of the request.
+    """
+
+    tasks = request.__dict__.setdefault('_task_access', {})
+    if task_id not in tasks:
+        memberships = Team.team_members.through.objects.filter(team_id = OuterRef('related_to_team'), user_id = request.user.pk)
+        assignments = Task.assigned_to.through.objects.filter(task_id = OuterRef('pk'), user_id = request.user.pk)
+        task = (Task.objects
+            .select_related('related_to_team')
+            .annotate(is_member = Exists(memberships), is_assignee = Exists(assignments))
+            .filter(pk = task_id)
+            .first())
+        if task is not None:
+            task.can_edit = task.is_assignee or task.created_by_id == request.user.pk
+        tasks[task_id] = task
+    return tasks[task_id]
+
+def team_member_required(view_function):
+    """Decorator for team views that redirects to the dashboard unless the user is a member of the team."""
+
+    @wraps(view_function)
+    def modified_view_function(request, team_id, *args, **kwargs):
+        team = get_team_access(request, team_id)
+        if team is None or not team.is_member:
+            return redirect('dashboard')
+        return view_function(request, team_id, *args, **kwargs)
+    return modified_view_function
+
+def task_member_required(view_function):
+    """Decorator for task views that redirects to the dashboard unless the user is a member of the task's team."""
+
+    @wraps(view_function)
+    def modified_view_function(request, task_id, *args, **kwargs):
+        task = get_task_access(request, task_id)
+        if task is None or not task.is_member:
+            return redirect('dashboard')
+        return view_function(request, task_id, *args, **kwargs)
+    return modified_view_function
@@ -0,0 +1,149 @@
+"""Resized, re-encoded variants of the static images and the manifest that lists them."""
+import hashlib
+import io
+import json
+import os
+import tempfile
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.urls import reverse
+
+MANIFEST_NAME = 'manifest.json'
+
+# Pillow format name, MIME type, file extension and save options of each output format
+FORMATS = {
+    'avif': ('AVIF', 'image/avif', 'avif', {'quality': 55}),
+    'webp': ('WEBP', 'image/webp', 'webp', {'quality': 80, 'method': 6}),
+    'png': ('PNG', 'image/png', 'png', {'optimize': True}),
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_manifest = (None, {})
+
+
+def manifest_path():
+    return os.path.join(settings.IMAGE_VARIANTS_DIR, MANIFEST_NAME)
+
+
+def load_image_manifest():
+    """Return the image variant manifest, reloading it only when the file has changed."""
+
+    global _manifest
+    path = manifest_path()
+    try:
+        modified = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    if _manifest[0] != (path, modified):
+        with open(path) as manifest:
+            _manifest = ((path, modified), json.load(manifest))
+    return _manifest[1]
+
+
+def get_image_variants(source):
+    """Return the manifest entry of a static image, or None if it has no variants."""
+
+    return load_image_manifest().get(source)
+
+
+def variant_url(path):
+    return reverse('image_variant', kwargs={'path': path})
+
+
+def fallback_format(image):
+    """Return the format every browser can show an image in: PNG if it is transparent, JPEG otherwise."""
+
+    return 'png' if image.mode in ('RGBA', 'LA', 'P') else 'jpeg'
+
+
+def encode_image(image, output_format):
+    """Return the bytes of an image saved in one of FORMATS."""
+
+    pillow_format, _, _, options = FORMATS[output_format]
+    if pillow_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+def supported_formats(formats):
+    """Return the formats the installed Pillow can write."""
+
+    from PIL import features
+
+    return [output_format for output_format in formats if output_format in ('png', 'jpeg') or features.check(output_format)]
+
+
+def build_image_variants(sources, formats, output_dir, log = None):
+    """Write each source image resized to each of its widths in each format, and return the manifest.
+
+    sources maps a static path to the widths wanted. Widths larger than the
+    source are skipped, and the source's own fallback format is always written.
+    File names contain a hash of their content so they can be cached forever.
+    """
+
+    from PIL import Image
+
+    manifest = {}
+    for source, widths in sources.items():
+        source_path = finders.find(source)
+        if source_path is None:
+            if log:
+                log(f'Skipping {source}: not found in the static files.')
+            continue
+
+        with Image.open(source_path) as original:
+            original.load()
+            name, _ = os.path.splitext(source)
+            entry = {'width': original.width, 'height': original.height, 'variants': {}}
+            fallback = fallback_format(original)
+            output_formats = formats if fallback in formats else [*formats, fallback]
+            for width in sorted({min(width, original.width) for width in widths}):
+                height = round(original.height * width / original.width)
+                resized = original.resize((width, height), Image.LANCZOS) if width != original.width else original
+                for output_format in output_formats:
+                    _, mime_type, extension, _ = FORMATS[output_format]
+                    data = encode_image(resized, output_format)
+                    digest = hashlib.sha256(data).hexdigest()[:12]
+                    path = f'{name}.{width}.{digest}.{extension}'
+                    # The name contains the content hash, so an existing file is already up to date
+                    write_file(os.path.join(output_dir, path), data, overwrite = False)
+                    entry['variants'].setdefault(mime_type, []).append([width, path])
+            entry['fallback'] = FORMATS[fallback][1]
+        manifest[source] = entry
+        if log:
+            log(f'{source}: {sum(len(variants) for variants in entry["variants"].values())} variants')
+
+    write_file(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, indent = 2).encode())
+    remove_stale_variants(manifest, output_dir)
+    return manifest
+
+
+def write_file(path, data, overwrite = True):
+    """Write a file atomically, keeping an existing one when overwrite is False."""
+
+    if not overwrite and os.path.exists(path):
+        return
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok = True)
+    descriptor, temporary_path = tempfile.mkstemp(dir = directory, suffix = '.tmp')
+    with os.fdopen(descriptor, 'wb') as output:
+        output.write(data)
+    # mkstemp creates the file readable by its owner only
+    os.chmod(temporary_path, 0o644)
+    os.replace(temporary_path, path)
+
+
+def remove_stale_variants(manifest, output_dir):
+    """Delete variant files that the manifest no longer lists."""
+
+    current = {MANIFEST_NAME}
+    for entry in manifest.values():
+        for variants in entry['variants'].values():
+            current.update(os.path.normpath(path) for _, path in variants)
+    for directory, _, files in os.walk(output_dir):
+        for file_name in files:
+            path = os.path.join(directory, file_name)
+            if os.path.relpath(path, output_dir) not in current:
+                os.remove(path)
@@ -0,0 +1,177 @@
+import json
+import sqlite3
+import time
+from collections import defaultdict
+from datetime import date
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from tasks.benchmarks import QueryTimer, find_regressions, summarize
+from tasks.management.commands.seed import Command as SeedCommand
+from tasks.models import Task
+from tasks.snapshots import restore_snapshot
+from tasks.views import TASK_SORT_FIELDS
+
+class Command(BaseCommand):
+    """Build automation command to benchmark the busiest views.
+
+    Requests go through the test client as a spread of seeded users, inside a
+    transaction that is rolled back afterwards, so every run sees the same data.
+    """
+
+    USER_COUNT = 5
+    ITERATIONS = 20
+    WARMUP = 2
+    THRESHOLD = 0.2
+    help = 'Measures the latency, queries and response size of the busiest views'
+
+    def add_arguments(self, parser):
+        dataset = parser.add_mutually_exclusive_group()
+        dataset.add_argument('--snapshot', help='Restore this snapshot before benchmarking')
+        dataset.add_argument('--profile', choices=SeedCommand.PROFILES, help='Unseed and seed this dataset size before benchmarking')
+        parser.add_argument('--users', type=int, default=self.USER_COUNT, help='Number of users the views are requested as')
+        parser.add_argument('--iterations', type=int, default=self.ITERATIONS, help='Number of measured requests to each view per user')
+        parser.add_argument('--warmup', type=int, default=self.WARMUP, help='Number of unmeasured requests to each view per user beforehand')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--baseline', help='Fail if the results regressed from this JSON file of earlier results')
+        parser.add_argument('--threshold', type=float, default=self.THRESHOLD, help='Fraction by which latency may exceed the baseline')
+
+    def handle(self, *args, **options):
+        """Benchmark the views."""
+
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1.')
+        baseline = self.load_baseline(options['baseline'])
+        if options['snapshot']:
+            try:
+                restore_snapshot(options['snapshot'])
+            except (ValueError, OSError, sqlite3.Error) as error:
+                raise CommandError(error)
+        elif options['profile']:
+            call_command('unseed', stdout=self.stdout)
+            call_command('seed', profile=options['profile'], seed=0, stdout=self.stdout)
+
+        samples = self.pick_samples(options['users'])
+        if not samples:
+            raise CommandError('There are no tasks in a team to benchmark, seed the database first.')
+
+        # The test runner has set the environment up already when benchmarking from a test
+        try:
+            setup_test_environment(debug=False)
+            set_up = True
+        except RuntimeError:
+            set_up = False
+        try:
+            with transaction.atomic():
+                timings = self.run(samples, options['warmup'], options['iterations'])
+                transaction.set_rollback(True)
+        finally:
+            if set_up:
+                teardown_test_environment()
+            # Pages cached during the run were built from the rolled back data
+            cache.clear()
+
+        results = {
+            'dataset': options['snapshot'] or options['profile'] or 'current',
+            'users': len(samples),
+            'iterations': options['iterations'],
+            'views': {view: summarize(view_timings) for view, view_timings in timings.items()},
+        }
+        self.report(results['views'])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+        if baseline is not None:
+            regressions = find_regressions(results['views'], baseline['views'], options['threshold'])
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions from {options['baseline']}.")
+
+    def load_baseline(self, path):
+        if path is None:
+            return None
+        try:
+            with open(path) as baseline:
+                return json.load(baseline)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Cannot read the baseline {path}: {error}')
+
+    def pick_samples(self, count):
+        """Return (user, task) pairs of assignments to team tasks, spread evenly over the dataset."""
+
+        assignments = Task.assigned_to.through.objects.filter(task__related_to_team__isnull=False).select_related('user', 'task').order_by('id')
+        total = assignments.count()
+        return [
+            (assignment.user, assignment.task)
+            for assignment in (assignments[i * total // count] for i in range(min(count, total)))
+        ]
+
+    def get_requests(self, task):
+        """Return (view, method, path, data for the nth request) for each benchmarked request about a task."""
+
+        search_word = ''.join(filter(str.isalpha, task.title.split()[0])).lower()
+        task_search = reverse('task_search')
+        requests = [
+            ('dashboard', 'get', reverse('dashboard'), lambda n: {}),
+            ('team_page', 'get', reverse('team_page', args=[task.related_to_team_id]), lambda n: {}),
+        ]
+        for order_by in TASK_SORT_FIELDS:
+            query = {'order_by': order_by, 'q': search_word} if order_by == 'relevance' else {'order_by': order_by}
+            requests.append((f'task_search?order_by={order_by}', 'get', task_search, lambda n, query=query: query))
+        requests += [
+            ('view_task', 'get', reverse('view_task', args=[task.id]), lambda n: {}),
+            ('edit_task', 'post', reverse('edit_task', args=[task.id]), lambda n: self.get_edit_data(task, n)),
+            ('update_task_completion', 'post', reverse('update_task_completion', args=[task.id]), lambda n: {'completed': 'on'} if n % 2 else {}),
+        ]
+        return requests
+
+    def get_edit_data(self, task, n):
+        """Return the task edit form's data with the task's completion toggled on every other request."""
+
+        data = {
+            'title': task.title,
+            'description': task.description,
+            'priority': task.priority,
+            'assigned_to': list(task.assigned_to.values_list('id', flat=True)),
+            # Due dates in the past are not accepted, which seeded tasks may have
+            'due_date': task.due_date if task.due_date and task.due_date >= date.today() else '',
+        }
+        if n % 2 != task.completed:
+            data['completed'] = 'on'
+        return data
+
+    def run(self, samples, warmup, iterations):
+        """Request every view as each sampled user and return the timings of each view."""
+
+        client = Client()
+        timings = defaultdict(list)
+        for user, task in samples:
+            client.force_login(user)
+            for view, method, path, get_data in self.get_requests(task):
+                for n in range(warmup + iterations):
+                    data = get_data(n)
+                    queries = QueryTimer()
+                    with connection.execute_wrapper(queries):
+                        start = time.perf_counter()
+                        response = getattr(client, method)(path, data)
+                        elapsed = time.perf_counter() - start
+                    expected_status = 302 if method == 'post' else 200
+                    if response.status_code != expected_status:
+                        raise CommandError(f'{view} returned {response.status_code} for {user.username} instead of {expected_status}.')
+                    if n >= warmup:
+                        timings[view].append((elapsed, queries.count, queries.seconds, len(response.content)))
+            client.logout()
+        return timings
+
+    def report(self, views):
+        self.stdout.write(f"{'view':<30} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'SQL ms':>9} {'bytes':>9}")
+        for view, stats in views.items():
+            self.stdout.write(
+                f"{view:<30} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} "
+                f"{stats['queries']:>8.1f} {stats['sql_ms']:>9.2f} {stats['bytes']:>9}"
+            )
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from tasks.images import FORMATS, build_image_variants, supported_formats
+
+class Command(BaseCommand):
+    """Build automation command to generate resized variants of the static images."""
+
+    help = 'Generates resized AVIF/WebP/PNG variants of the images in IMAGE_VARIANTS and their manifest'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', action='append', dest='formats', choices=sorted(FORMATS),
+            help='Format to generate besides the fallback, can be repeated (default: IMAGE_VARIANT_FORMATS)',
+        )
+
+    def handle(self, *args, **options):
+        """Generate the image variants."""
+
+        try:
+            import PIL
+        except ImportError:
+            raise CommandError('Pillow is required to generate image variants: pip install Pillow')
+
+        formats = options['formats'] or settings.IMAGE_VARIANT_FORMATS
+        usable_formats = supported_formats(formats)
+        for skipped in sorted(set(formats) - set(usable_formats)):
+            self.stderr.write(f'Skipping {skipped}: not supported by the installed Pillow.')
+
+        build_image_variants(settings.IMAGE_VARIANTS, usable_formats, settings.IMAGE_VARIANTS_DIR, log=self.stdout.write)
+        self.stdout.write(f'Image variants written to {settings.IMAGE_VARIANTS_DIR}')
@@ -1,10 +1,17 @@
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
 
-from tasks.models import User, Team, Task, Invites, AuditLog
+from tasks.models import User, Team, Task, Invites, AuditLog, hash_email
+from tasks.search import deferred_search_index
 
-import pytz
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.utils import timezone
 from faker import Faker
-from random import randint, random
+from random import Random
 
 user_fixtures = [
     {'username': '@johndoe', 'email': 'john.doe@example.org', 'first_name': 'John', 'last_name': 'Doe'},
@@ -14,23 +21,71 @@ user_fixtures = [
 
 
 class Command(BaseCommand):
-    """Build automation command to seed the database."""
+    """Build automation command to seed the database.
+
+    Users are inserted with bulk_create and everything else as raw rows, one
+    transaction per batch of users, and the default password is hashed only
+    once for every user.
+    """
 
     USER_COUNT = 300
     DEFAULT_PASSWORD = 'Password123'
     TASKS_PER_USER = 4
     TEAMS_PER_USER = 4
     INVITES_PER_USER = 5
+    BATCH_SIZE = 2000
+    # Dataset sizes for benchmarks, overridden by any of the flags given
+    PROFILES = {
+        'small': {'users': USER_COUNT, 'teams_per_user': TEAMS_PER_USER, 'tasks_per_user': TASKS_PER_USER, 'invites_per_user': INVITES_PER_USER},
+        'medium': {'users': 10_000, 'teams_per_user': 4, 'tasks_per_user': 4, 'invites_per_user': 5},
+        'large': {'users': 100_000, 'teams_per_user': 4, 'tasks_per_user': 4, 'invites_per_user': 5},
+        'xlarge': {'users': 1_000_000, 'teams_per_user': 4, 'tasks_per_user': 4, 'invites_per_user': 5},
+    }
+    # Seeded datasets are dated from here rather than today, so that they are identical every time
+    SEED_DATE = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+    # Random text is picked from a pool, since generating it is slower than inserting it
+    TEXT_POOL_SIZE = 1000
     help = 'Seeds the database with sample data'
 
-    def __init__(self):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.faker = Faker('en_GB')
 
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=self.PROFILES, help='Dataset size to seed (default: small)')
+        parser.add_argument('--seed', type=int, help='Seed the random generators so every run produces the same dataset')
+        parser.add_argument('--users', type=int, help=f'Total number of users to end up with (default: {self.USER_COUNT})')
+        parser.add_argument('--teams-per-user', type=int, help=f'Maximum number of teams each user joins (default: {self.TEAMS_PER_USER})')
+        parser.add_argument('--tasks-per-user', type=int, help=f'Maximum number of tasks per user in each team (default: {self.TASKS_PER_USER})')
+        parser.add_argument('--invites-per-user', type=int, help=f'Maximum number of invites each user receives (default: {self.INVITES_PER_USER})')
+        parser.add_argument('--batch-size', type=int, default=self.BATCH_SIZE, help='Number of users seeded in each transaction')
+
     def handle(self, *args, **options):
+        sizes = self.PROFILES[options['profile'] or 'small']
+        self.user_count = options['users'] or sizes['users']
+        self.teams_per_user = options['teams_per_user'] or sizes['teams_per_user']
+        self.tasks_per_user = options['tasks_per_user'] or sizes['tasks_per_user']
+        self.invites_per_user = options['invites_per_user'] or sizes['invites_per_user']
+        self.batch_size = options['batch_size']
+
+        seed = options['seed']
+        self.random = Random(seed)
+        if seed is None:
+            self.now = timezone.now()
+            self.password = make_password(Command.DEFAULT_PASSWORD)
+        else:
+            self.faker.seed_instance(seed)
+            self.now = self.SEED_DATE
+            # A fixed salt keeps the password hashes identical between runs too
+            self.password = make_password(Command.DEFAULT_PASSWORD, salt=f'seed{seed}')
+        self.sentences = [self.faker.sentence() for _ in range(self.TEXT_POOL_SIZE)]
+        self.words = [self.faker.word() for _ in range(self.TEXT_POOL_SIZE)]
+
+        self.new_user_ids = []
         self.create_users()
-        self.users = User.objects.all()
-        self.create_teams()
-        self.create_tasks()
+        self.user_ids = list(User.objects.exclude(username='@johndoe').order_by('id').values_list('id', flat=True))
+        with deferred_search_index():
+            self.create_teams()
         self.create_invites()
 
     def create_users(self):
@@ -38,107 +93,160 @@ class Command(BaseCommand):
         self.generate_random_users()
 
     def generate_user_fixtures(self):
-        for data in user_fixtures:
-            self.try_create_user(data)
+        existing = set(User.objects.filter(username__in=[data['username'] for data in user_fixtures]).values_list('username', flat=True))
+        users = [self.build_user(data) for data in user_fixtures if data['username'] not in existing]
+        for user in users:
+            if user.username == '@johndoe':
+                user.is_superuser = True
+                user.is_staff = True
+        self.save_users(users)
 
     def generate_random_users(self):
-        user_count = User.objects.count()
-        while  user_count < self.USER_COUNT:
-            print(f"Seeding user {user_count}/{self.USER_COUNT}", end='\r')
-            self.generate_user()
-            user_count = User.objects.count()
+        usernames = set(User.objects.values_list('username', flat=True))
+        emails = set(User.objects.values_list('email', flat=True))
+        user_count = len(usernames)
+        while user_count < self.user_count:
+            batch = []
+            while len(batch) < min(self.batch_size, self.user_count - user_count):
+                data = self.generate_user_data(usernames, emails)
+                batch.append(self.build_user(data))
+            self.save_users(batch)
+            user_count += len(batch)
+            print(f"Seeding user {user_count}/{self.user_count}", end='\r')
         print("User seeding complete.      ")
 
-    def generate_user(self):
+    def generate_user_data(self, usernames, emails):
         first_name = self.faker.first_name()
         last_name = self.faker.last_name()
-        email = create_email(first_name, last_name)
+        while not (first_name + last_name).isalpha():
+            first_name = self.faker.first_name()
+            last_name = self.faker.last_name()
         username = create_username(first_name, last_name)
-        self.try_create_user({'username': username, 'email': email, 'first_name': first_name, 'last_name': last_name})
-       
-    def try_create_user(self, data):
-        try:
-            self.create_user(data)
-        except:
-            pass
-
-    def create_user(self, data):
-        user = User.objects.create_user(
+        email = create_email(first_name, last_name)
+        suffix = 1
+        while username in usernames or email.lower() in emails:
+            suffix += 1
+            username = create_username(first_name, last_name, suffix)
+            email = create_email(first_name, last_name, suffix)
+        usernames.add(username)
+        emails.add(email.lower())
+        return {'username': username, 'email': email, 'first_name': first_name, 'last_name': last_name}
+
+    def save_users(self, users):
+        User.objects.bulk_create(users)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id'))
+            for user in users:
+                user.id = ids[user.username]
+        self.new_user_ids += [user.id for user in users if user.username != '@johndoe']
+
+    def build_user(self, data):
+        return User(
             username=data['username'],
             email=data['email'],
-            password=Command.DEFAULT_PASSWORD,
+            email_hash=hash_email(data['email']),
+            password=self.password,
+            date_joined=self.now,
             first_name=data['first_name'],
             last_name=data['last_name'],
         )
-        if data['username'] == '@johndoe':
-            user.is_superuser = True
-            user.is_staff = True
-            user.save()
 
     def create_teams(self):
-        for user in User.objects.all():
-            if user.username != '@johndoe':
-                for i in range(randint(1, self.TEAMS_PER_USER)):
-                    team_leader = self.users.exclude(id=user.id).exclude(username='@johndoe').order_by('?').first()
-                    team = Team.objects.create(
-                        team_leader=team_leader,
-                        team_name=self.faker.word(),
-                        team_description=self.faker.sentence(),
+        self.next_team_id = (Team.objects.aggregate(Max('team_id'))['team_id__max'] or 0) + 1
+        self.next_task_id = (Task.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+        self.today = self.now.date()
+        self.timestamp = connection.ops.adapt_datetimefield_value(self.now)
+
+        john = User.objects.get(username='@johndoe')
+        if not Team.objects.filter(team_leader=john, team_name="Seeded team").exists():
+            members = User.objects.filter(username__in=['@johndoe', '@janedoe', '@charlie'])
+            team = (john.id, "Seeded team", "This team is seeded as required")
+            self.save_teams([(team, [member.id for member in members])])
+
+        # Only users created by this run join teams, so seeding again tops the data up
+        for start in range(0, len(self.new_user_ids), self.batch_size):
+            teams = []
+            for user_id in self.new_user_ids[start:start + self.batch_size]:
+                for i in range(self.random.randint(1, self.teams_per_user)):
+                    team_leader_id = self.pick_other_user(user_id)
+                    team = (team_leader_id, self.random.choice(self.words), self.random.choice(self.sentences))
+                    teams.append((team, [team_leader_id, user_id]))
+            self.save_teams(teams)
+            print(f"Seeding teams and tasks {min(start + self.batch_size, len(self.new_user_ids))}/{len(self.new_user_ids)}", end='\r')
+
+        # Ids were assigned here rather than by the database, so move its sequences past them
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Team, Task]):
+                cursor.execute(sql)
+        print("Team and task seeding complete.      ")
+
+    def pick_other_user(self, user_id):
+        other_user_id = self.random.choice(self.user_ids)
+        while other_user_id == user_id and len(self.user_ids) > 1:
+            other_user_id = self.random.choice(self.user_ids)
+        return other_user_id
+
+    def save_teams(self, teams):
+        """Insert (team_leader_id, team_name, team_description) teams with their members, tasks and audit logs in one transaction."""
+
+        team_rows, member_rows, task_rows, assignment_rows, log_rows = [], [], [], [], []
+        for (team_leader_id, team_name, team_description), member_ids in teams:
+            team_id = self.next_team_id
+            self.next_team_id += 1
+            team_rows.append((team_id, team_leader_id, team_name, team_description, 0))
+            team_tasks = []
+            for user_id in sorted(set(member_ids)):
+                member_rows.append((team_id, user_id))
+                for i in range(self.random.randint(1, self.tasks_per_user)):
+                    task = (
+                        self.next_task_id, self.random.choice(self.sentences), self.random.choice(self.sentences), user_id, team_id,
+                        self.today + timedelta(days=self.random.randint(0, 365)), Task.PRIORITY_CHOICES[self.random.randint(0, 3)][0], bool(self.random.randint(0, 1)),
                     )
-                    team.team_members.add(team_leader)
-                    team.team_members.add(user)
-            else:
-                team = Team.objects.create(
-                    team_leader=user,
-                    team_name="Seeded team",
-                    team_description="This team is seeded as required",
-                )
-                team.team_members.add(user)
-                team.team_members.add(User.objects.get(username='@janedoe'))
-                team.team_members.add(User.objects.get(username='@charlie'))
-            print(f"Seeding teams", end='\r')
-        print("Team seeding complete.      ")
-
-    def create_tasks(self):
-        for team in Team.objects.all():
-            for user in team.team_members.all():
-                for i in range(randint(1, self.TASKS_PER_USER)):
-                    task = Task.objects.create(
-                        title=self.faker.sentence(),
-                        description=self.faker.sentence(),
-                        created_by=user,
-                        related_to_team=team,
-                        due_date=self.faker.date_time_between(start_date='+0y', end_date='+1y', tzinfo=pytz.UTC),
-                        priority=Task.PRIORITY_CHOICES[randint(0, 3)][0],
-                        completed = randint(0,1)
-                    )
-                    task.assigned_to.add(user)
-
-                    AuditLog.objects.create(
-                        username=user,
-                        team=team,
-                        task_title=task.title,
-                        action='Created',
-                    )
-            print(f"Seeding tasks", end='\r')
-        print("Task seeding complete.      ")
+                    self.next_task_id += 1
+                    team_tasks.append(task)
+                    assignment_rows.append((task[0], user_id))
+            task_rows += team_tasks
+            # Only as many creations are logged as AUDIT_LOG_RETENTION keeps
+            log_rows += [
+                (task[3], team_id, task[1], 'Created', self.timestamp)
+                for task in team_tasks[-settings.AUDIT_LOG_RETENTION:]
+            ]
+
+        with transaction.atomic():
+            insert_rows(Team, ['team_id', 'team_leader', 'team_name', 'team_description', 'revision'], team_rows)
+            insert_rows(Team.team_members.through, ['team', 'user'], member_rows)
+            insert_rows(Task, ['id', 'title', 'description', 'created_by', 'related_to_team', 'due_date', 'priority', 'completed'], task_rows)
+            insert_rows(Task.assigned_to.through, ['task', 'user'], assignment_rows)
+            insert_rows(AuditLog, ['username', 'team', 'task_title', 'action', 'timestamp'], log_rows)
 
     def create_invites(self):
-        for user in User.objects.all():
-            for i in range(randint(1, self.INVITES_PER_USER)):
-                team = Team.objects.all().order_by('?').first()
-                if not Invites.objects.filter(team_id=team.team_id, username=user).exists():
-                    invite = Invites.objects.create(
-                        username=user,
-                        team_id=team.team_id,
-                    )
-            print(f"Seeding invites", end='\r')
+        team_ids = list(Team.objects.order_by('team_id').values_list('team_id', flat=True))
+        if not team_ids:
+            return
+        for start in range(0, len(self.new_user_ids), self.batch_size):
+            invite_rows = []
+            for user_id in self.new_user_ids[start:start + self.batch_size]:
+                invite_count = min(self.random.randint(1, self.invites_per_user), len(team_ids))
+                invite_rows += [(user_id, team_id) for team_id in self.random.sample(team_ids, invite_count)]
+            with transaction.atomic():
+                insert_rows(Invites, ['username', 'team'], invite_rows)
+            print(f"Seeding invites {min(start + self.batch_size, len(self.new_user_ids))}/{len(self.new_user_ids)}", end='\r')
         print("Invite seeding complete.      ")
 
-def create_username(first_name, last_name):
-    return '@' + first_name.lower() + last_name.lower()
+def insert_rows(model, fields, rows):
+    """Insert tuples of values for the given fields of a model, skipping the ORM for speed."""
 
-def create_email(first_name, last_name):
-    return first_name + '.' + last_name + '@example.org'
+    if not rows:
+        return
+    quote_name = connection.ops.quote_name
+    columns = ', '.join(quote_name(model._meta.get_field(field).column) for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {quote_name(model._meta.db_table)} ({columns}) VALUES ({placeholders})', rows)
 
+def create_username(first_name, last_name, suffix=''):
+    suffix = str(suffix)
+    return '@' + (first_name.lower() + last_name.lower())[:29 - len(suffix)] + suffix
 
+def create_email(first_name, last_name, suffix=''):
+    return first_name + '.' + last_name + str(suffix) + '@example.org'
@@ -0,0 +1,28 @@
+import sqlite3
+import time
+from django.core.management.base import BaseCommand, CommandError
+from tasks.snapshots import restore_snapshot, save_snapshot
+
+class Command(BaseCommand):
+    """Build automation command to save the database to a file or restore it from one."""
+
+    help = 'Saves the SQLite database to a snapshot file, or restores it from one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['save', 'restore'])
+        parser.add_argument('path', help='Snapshot file')
+        parser.add_argument('--database', default='default', help='Database to save or restore')
+
+    def handle(self, *args, **options):
+        """Save or restore the snapshot."""
+
+        start = time.perf_counter()
+        try:
+            if options['action'] == 'save':
+                save_snapshot(options['path'], options['database'])
+            else:
+                restore_snapshot(options['path'], options['database'])
+        except (ValueError, OSError, sqlite3.Error) as error:
+            raise CommandError(error)
+        verb = 'Saved' if options['action'] == 'save' else 'Restored'
+        self.stdout.write(f"{verb} {options['path']} in {time.perf_counter() - start:.2f}s")
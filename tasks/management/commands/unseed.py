@@ -1,14 +1,92 @@
-from django.core.management.base import BaseCommand, CommandError
-from tasks.models import User, Team, Invites
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from tasks.models import User, Team, Task, Invites, AuditLog
+from tasks.search import deferred_search_index
 
 class Command(BaseCommand):
-    """Build automation command to unseed the database."""
-    
-    help = 'Seeds the database with sample data'
+    """Build automation command to unseed the database.
+
+    Deletes every team with its tasks, invites and audit logs, and every
+    non-staff user. Rows are deleted with raw SQL in dependency order, a batch
+    at a time, so only one batch of ids is held in memory and transactions stay short.
+    """
+
+    BATCH_SIZE = 10000
+    help = 'Deletes the seeded data: all teams and every user who is not staff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=self.BATCH_SIZE, help='Number of rows deleted in each transaction')
 
     def handle(self, *args, **options):
         """Unseed the database."""
 
-        User.objects.filter(is_staff=False).delete()
-        Team.objects.all().delete()
-        Invites.objects.all().delete()
+        self.batch_size = options['batch_size']
+        quote_name = connection.ops.quote_name
+        non_staff = f"SELECT id FROM {quote_name(User._meta.db_table)} WHERE is_staff = %s"
+
+        # Children before parents, so no foreign key is ever left dangling
+        steps = [
+            (Task, f"related_to_team_id IS NOT NULL OR created_by_id IN ({non_staff})", [False], [(Task.assigned_to.through, 'task_id')]),
+            (Task.assigned_to.through, f"user_id IN ({non_staff})", [False], []),
+            (AuditLog, None, [], []),
+            (Invites, None, [], []),
+            (Team.team_members.through, None, [], []),
+            (Team, None, [], []),
+            (User.groups.through, f"user_id IN ({non_staff})", [False], []),
+            (User.user_permissions.through, f"user_id IN ({non_staff})", [False], []),
+        ]
+        if apps.is_installed('django.contrib.admin'):
+            steps.append((apps.get_model('admin', 'LogEntry'), f"user_id IN ({non_staff})", [False], []))
+        steps.append((User, "is_staff = %s", [False], []))
+
+        deleted = {}
+        with deferred_search_index():
+            for model, condition, params, children in steps:
+                for table, count in self.delete_rows(model, condition, params, children).items():
+                    deleted[table] = deleted.get(table, 0) + count
+        for table, count in deleted.items():
+            self.stdout.write(f'{table}: {count} rows deleted')
+
+        # Cached dashboards were built from the deleted data
+        cache.clear()
+        self.stdout.write('Unseeding complete.')
+
+    def delete_rows(self, model, condition, params, children):
+        """Delete the rows of a model matching an SQL condition and return the number deleted from each table.
+
+        Without a condition the whole table is emptied in one statement, which
+        SQLite does without visiting each row. Otherwise the ids of batch_size
+        rows at a time are selected, and those rows are deleted in their own
+        transaction together with the rows of the (child model, foreign key
+        column) children pointing at them.
+        """
+
+        quote_name = connection.ops.quote_name
+        table = model._meta.db_table
+        deleted = {child._meta.db_table: 0 for child, _ in children}
+        deleted[table] = 0
+        if condition is None:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {quote_name(table)}')
+                deleted[table] = cursor.rowcount
+            return deleted
+
+        pk = quote_name(model._meta.pk.column)
+        batch = f'SELECT {pk} FROM {quote_name(table)} WHERE {condition} LIMIT {int(self.batch_size)}'
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                # Selected once, so the children deleted are exactly those of the rows deleted
+                cursor.execute(batch, params)
+                ids = [row[0] for row in cursor.fetchall()]
+                if not ids:
+                    return deleted
+                placeholders = ', '.join(['%s'] * len(ids))
+                for child, column in children:
+                    cursor.execute(f'DELETE FROM {quote_name(child._meta.db_table)} WHERE {quote_name(column)} IN ({placeholders})', ids)
+                    deleted[child._meta.db_table] += cursor.rowcount
+                cursor.execute(f'DELETE FROM {quote_name(table)} WHERE {pk} IN ({placeholders})', ids)
+                deleted[table] += cursor.rowcount
+            if len(ids) < self.batch_size:
+                return deleted
@@ -0,0 +1,42 @@
+import base64
+import hashlib
+import os
+from urllib.error import URLError
+from urllib.request import urlopen
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+class Command(BaseCommand):
+    """Build automation command to download the third party CSS, JavaScript and fonts into static/."""
+
+    help = 'Downloads the files in VENDOR_ASSETS into the static directory, checking their integrity'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Download files that are already vendored again')
+
+    def handle(self, *args, **options):
+        """Download the vendor files."""
+
+        static_dir = settings.STATICFILES_DIRS[0]
+        for path, (url, integrity) in settings.VENDOR_ASSETS.items():
+            destination = os.path.join(static_dir, path)
+            if os.path.exists(destination) and not options['force']:
+                self.stdout.write(f'{path} already vendored')
+                continue
+
+            try:
+                with urlopen(url, timeout=30) as response:
+                    data = response.read()
+            except URLError as error:
+                raise CommandError(f'Could not download {url}: {error}')
+
+            if integrity:
+                algorithm, expected = integrity.split('-', 1)
+                actual = base64.b64encode(hashlib.new(algorithm, data).digest()).decode()
+                if actual != expected:
+                    raise CommandError(f'{url} does not match its integrity {integrity}')
+
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            with open(destination, 'wb') as vendored:
+                vendored.write(data)
+            self.stdout.write(f'{path} downloaded from {url}')
@@ -0,0 +1,61 @@
+"""Prometheus metrics of the requests, queries, audit log and cache, and their rendering for the metrics view.
+
+Under a pre-forking server, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory in the server's environment: every worker then records its
+metrics in files there, and the metrics view adds them up across workers.
+"""
+import os
+from django.apps import apps
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+REQUEST_DURATION = Histogram('task_manager_request_duration_seconds', 'Time taken to respond to requests', ['view'])
+REQUESTS = Counter('task_manager_requests', 'Requests answered', ['view', 'status'])
+REQUEST_QUERIES = Histogram(
+    'task_manager_request_queries', 'SQL queries run per request', ['view'],
+    buckets = (0, 1, 2, 5, 10, 20, 50, 100, 200, float('inf')),
+)
+AUDIT_LOG_WRITES = Counter('task_manager_audit_log_writes', 'Audit log entries written')
+CACHE_LOOKUPS = Counter('task_manager_cache_lookups', 'Cache lookups made by requests', ['result'])
+
+
+def observe_request(view, status, profile):
+    """Record a request to view answered with status, measured by a RequestProfile."""
+
+    REQUEST_DURATION.labels(view).observe(profile.seconds)
+    REQUESTS.labels(view, str(status)).inc()
+    REQUEST_QUERIES.labels(view).observe(profile.queries.count)
+    if profile.cache_hits:
+        CACHE_LOOKUPS.labels('hit').inc(profile.cache_hits)
+    if profile.cache_misses:
+        CACHE_LOOKUPS.labels('miss').inc(profile.cache_misses)
+
+
+class DatabaseCollector:
+    """Gauges of the active sessions and the rows of each model, read from the database when scraped."""
+
+    def collect(self):
+        sessions = GaugeMetricFamily('task_manager_active_sessions', 'Sessions that have not expired')
+        sessions.add_metric([], Session.objects.filter(expire_date__gt = timezone.now()).count())
+        yield sessions
+
+        rows = GaugeMetricFamily('task_manager_model_rows', 'Rows of each model of the tasks app', labels = ['model'])
+        for model in apps.get_app_config('tasks').get_models():
+            rows.add_metric([model.__name__], model.objects.count())
+        yield rows
+
+
+def generate_metrics():
+    """Return every metric in the Prometheus text format."""
+
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    database = CollectorRegistry()
+    database.register(DatabaseCollector())
+    return generate_latest(registry) + generate_latest(database)
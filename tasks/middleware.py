@@ -0,0 +1,149 @@
+"""Middleware of the task manager."""
+import json
+import logging
+import mimetypes
+import os
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.db import connections
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+from .assets import HASHED_NAME
+from .metrics import observe_request
+from .profiling import RequestProfile
+from .slow_queries import SlowQueryLogger
+
+profiling_logger = logging.getLogger('tasks.profiling')
+
+
+class PrecompressedStaticMiddleware:
+    """Serve collected static files, preferring their .br or .gz copy when the client accepts it.
+
+    Files with a content hash in their name are cached forever, the rest for
+    STATIC_MAX_AGE seconds. Requests for anything not in STATIC_ROOT go on
+    to the next middleware as usual.
+    """
+
+    ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, get_response):
+        if not settings.STATIC_ROOT or not settings.STATIC_URL.startswith('/'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = settings.STATIC_ROOT
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            response = self.serve(request, request.path_info[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        accepted = {
+            coding.split(';')[0].strip() for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+            if not coding.replace(' ', '').endswith(';q=0')
+        }
+        served_path, encoding = path, None
+        for candidate, suffix in self.ENCODINGS:
+            if candidate in accepted and os.path.isfile(path + suffix):
+                served_path, encoding = path + suffix, candidate
+                break
+
+        stat = os.stat(served_path)
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(path)
+            response = FileResponse(open(served_path, 'rb'), content_type = content_type or 'application/octet-stream')
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if HASHED_NAME.search(name):
+            response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = f'public, max-age={settings.STATIC_MAX_AGE}'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class ProfilingMiddleware:
+    """Report the total, SQL and template time and the cache lookups of each request in a Server-Timing header.
+
+    Only used when PROFILING is set, and also logs each profile as a line of
+    JSON, tagged with the URL name, when PROFILING_LOG is set. SQL run while a
+    template renders counts towards both the SQL and the template time.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        with profile.measure():
+            response = self.get_response(request)
+        response['Server-Timing'] = profile.server_timing()
+        if settings.PROFILING_LOG:
+            match = request.resolver_match
+            profiling_logger.info(json.dumps({
+                'view': match.view_name if match else None,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                **profile.as_dict(),
+            }))
+        return response
+
+
+class SlowQueryLogMiddleware:
+    """Log each SQL statement of a request taking SLOW_QUERY_THRESHOLD_MS or more to the tasks.slow_queries logger.
+
+    Entries name the view, the lines of application code and the template
+    that ran the statement. Only used when SLOW_QUERY_THRESHOLD_MS is set.
+    """
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_THRESHOLD_MS is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        slow_query_logger = SlowQueryLogger(request, settings.SLOW_QUERY_THRESHOLD_MS / 1000)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(slow_query_logger))
+            return self.get_response(request)
+
+
+class MetricsMiddleware:
+    """Record the latency, status, query count and cache lookups of each request in the Prometheus metrics.
+
+    Requests are labelled with their URL name. Only used when METRICS_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        with profile.measure():
+            response = self.get_response(request)
+        match = request.resolver_match
+        observe_request(match.view_name if match else 'unresolved', response.status_code, profile)
+        return response
@@ -0,0 +1,55 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_task_search_index(apps, schema_editor):
+    """Create an FTS5 index over task titles and descriptions, kept in sync by triggers."""
+
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE tasks_task_fts USING fts5("
+                "title, description, content='tasks_task', content_rowid='id')"
+            )
+        except OperationalError:
+            # SQLite was built without FTS5, so searches use icontains instead
+            return
+        cursor.execute(
+            "CREATE TRIGGER tasks_task_fts_insert AFTER INSERT ON tasks_task BEGIN "
+            "INSERT INTO tasks_task_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+            "END"
+        )
+        cursor.execute(
+            "CREATE TRIGGER tasks_task_fts_delete AFTER DELETE ON tasks_task BEGIN "
+            "INSERT INTO tasks_task_fts(tasks_task_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+            "END"
+        )
+        cursor.execute(
+            "CREATE TRIGGER tasks_task_fts_update AFTER UPDATE OF title, description ON tasks_task BEGIN "
+            "INSERT INTO tasks_task_fts(tasks_task_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+            "INSERT INTO tasks_task_fts(rowid, title, description) VALUES (new.id, new.title, new.description); "
+            "END"
+        )
+        cursor.execute("INSERT INTO tasks_task_fts(tasks_task_fts) VALUES ('rebuild')")
+
+
+def drop_task_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for trigger in ['tasks_task_fts_insert', 'tasks_task_fts_delete', 'tasks_task_fts_update']:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute("DROP TABLE IF EXISTS tasks_task_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0048_merge_20231215_1243'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_task_search_index, drop_task_search_index),
+    ]
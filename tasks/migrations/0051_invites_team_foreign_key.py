@@ -0,0 +1,60 @@
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F
+
+
+def copy_team_ids(apps, schema_editor):
+    """Point each invite at its team, deleting invites to teams that no longer exist."""
+
+    Invites = apps.get_model('tasks', 'Invites')
+    Team = apps.get_model('tasks', 'Team')
+    Invites.objects.exclude(legacy_team_id__in=Team.objects.values('team_id')).delete()
+    Invites.objects.update(team_id=F('legacy_team_id'))
+
+
+def copy_team_ids_back(apps, schema_editor):
+    Invites = apps.get_model('tasks', 'Invites')
+    Invites.objects.update(legacy_team_id=F('team_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0050_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='invites',
+            unique_together=set(),
+        ),
+        migrations.RenameField(
+            model_name='invites',
+            old_name='team_id',
+            new_name='legacy_team_id',
+        ),
+        migrations.AlterField(
+            model_name='invites',
+            name='legacy_team_id',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='invites',
+            name='team',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='invites', to='tasks.team'),
+        ),
+        migrations.RunPython(copy_team_ids, copy_team_ids_back),
+        migrations.RemoveField(
+            model_name='invites',
+            name='legacy_team_id',
+        ),
+        migrations.AlterField(
+            model_name='invites',
+            name='team',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invites', to='tasks.team'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='invites',
+            unique_together={('team', 'username')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-18 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0051_invites_team_foreign_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
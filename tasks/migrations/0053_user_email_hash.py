@@ -0,0 +1,28 @@
+# Generated by Django 4.2.6 on 2026-10-18 18:31
+
+from django.db import migrations, models
+from libgravatar import md5_hash, sanitize_email
+
+
+def hash_existing_emails(apps, schema_editor):
+    User = apps.get_model('tasks', 'User')
+    users = list(User.objects.only('id', 'email'))
+    for user in users:
+        user.email_hash = md5_hash(sanitize_email(user.email))
+    User.objects.bulk_update(users, ['email_hash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0052_team_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='email_hash',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.RunPython(hash_existing_emails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0053_user_email_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='email_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=32),
+        ),
+    ]
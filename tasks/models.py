@@ -1,9 +1,18 @@
+from django.conf import settings
 from django.core.validators import RegexValidator
 from django.contrib.auth.models import AbstractUser
-from django.db import models
-from libgravatar import Gravatar
+from django.db import connection, models, transaction
+from django.db.models import F
+from libgravatar import md5_hash, sanitize_email
+from django.urls import reverse
 from django.utils import timezone
 
+def hash_email(email):
+    """Return the gravatar hash of an email address."""
+
+    return md5_hash(sanitize_email(email))
+
+
 class User(AbstractUser):
     """Model used for user authentication, and team member related information."""
 
@@ -37,6 +46,8 @@ class User(AbstractUser):
         ],
     )
     email = models.EmailField(unique=True, blank=False)
+    # MD5 of the normalised email, as used in gravatar URLs
+    email_hash = models.CharField(max_length=32, blank=True, editable=False, db_index=True)
 
 
     class Meta:
@@ -49,12 +60,32 @@ class User(AbstractUser):
 
         return f'{self.first_name} {self.last_name}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Load a user and remember the email the stored hash belongs to."""
+
+        user = super().from_db(db, field_names, values)
+        user._loaded_email = user.__dict__.get('email')
+        return user
+
+    def save(self, *args, **kwargs):
+        """Save the user, hashing the email only when it has changed."""
+
+        if not self.email_hash or self.email != getattr(self, '_loaded_email', None):
+            self.email_hash = hash_email(self.email)
+            self._loaded_email = self.email
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'email_hash' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'email_hash']
+        super().save(*args, **kwargs)
+
     def gravatar(self, size=120):
-        """Return a URL to the user's gravatar."""
+        """Return a URL to the user's avatar, from gravatar or a local identicon depending on AVATAR_MODE."""
 
-        gravatar_object = Gravatar(self.email)
-        gravatar_url = gravatar_object.get_image(size=size, default='mp')
-        return gravatar_url
+        email_hash = self.email_hash or hash_email(self.email)
+        if settings.AVATAR_MODE == 'identicon':
+            return reverse('avatar', kwargs={'email_hash': email_hash, 'size': size})
+        return f'https://www.gravatar.com/avatar/{email_hash}?size={size}&default=mp'
 
     def mini_gravatar(self):
         """Return a URL to a miniature version of the user's gravatar."""
@@ -73,6 +104,51 @@ class Team(models.Model):
         max_length=200,
     ) 
     team_members = models.ManyToManyField(User, related_name = 'member_of_team')
+    # Incremented whenever the team's tasks, members or invites change
+    revision = models.PositiveBigIntegerField(default = 0)
+
+    @staticmethod
+    def bump_revision(team_id):
+        """Record that the tasks, members or invites of a team changed."""
+
+        Team.objects.filter(team_id = team_id).update(revision = F('revision') + 1)
+
+    @staticmethod
+    def delete_tasks(team_id):
+        """Delete a team's tasks and their assignments in one statement each.
+
+        Deleting them through the ORM would load every task and delete them a hundred at a time.
+        """
+
+        with transaction.atomic():
+            Task.assigned_to.through.objects.filter(task__related_to_team_id = team_id).delete()
+            with connection.cursor() as cursor:
+                table = connection.ops.quote_name(Task._meta.db_table)
+                column = connection.ops.quote_name(Task._meta.get_field('related_to_team').column)
+                cursor.execute(f'DELETE FROM {table} WHERE {column} = %s', [team_id])
+
+    def remove_member(self, user):
+        """Remove user from the team, unassign them from its tasks and delete tasks left unassigned.
+
+        The unassigned tasks are deleted in one statement, as in delete_tasks.
+        """
+
+        with transaction.atomic():
+            self.team_members.remove(user)
+            Task.assigned_to.through.objects.filter(task__related_to_team = self, user = user).delete()
+            with connection.cursor() as cursor:
+                table = connection.ops.quote_name(Task._meta.db_table)
+                column = connection.ops.quote_name(Task._meta.get_field('related_to_team').column)
+                through = Task.assigned_to.through._meta
+                through_table = connection.ops.quote_name(through.db_table)
+                through_column = connection.ops.quote_name(through.get_field('task').column)
+                pk = connection.ops.quote_name(Task._meta.pk.column)
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE {column} = %s AND NOT EXISTS '
+                    f'(SELECT 1 FROM {through_table} WHERE {through_table}.{through_column} = {table}.{pk})',
+                    [self.team_id],
+                )
+            Team.bump_revision(self.team_id)
 
 
 class Invites(models.Model):
@@ -80,11 +156,11 @@ class Invites(models.Model):
 
     """Three different states any invite can be in are sent, rejected and accepted"""
     username = models.ForeignKey(User, on_delete=models.CASCADE)
-    team_id = models.IntegerField()
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='invites')
 
     """Unique Constraint"""
     class Meta:
-        unique_together = ('team_id', 'username')
+        unique_together = ('team', 'username')
 
 class Task(models.Model):
     """Tasks to be set to users"""
@@ -97,6 +173,19 @@ class Task(models.Model):
         ('high', 'High'),
     ]
 
+    # Rank of each priority when ordering tasks, highest priority first
+    PRIORITY_RANKS = {'high': 0, 'medium': 1, 'low': 2, '': 3}
+
+    # Fields whose changes are recorded when a task is edited, with their display names
+    TRACKED_FIELDS = [
+        ('title', 'Title'),
+        ('description', 'Description'),
+        ('due_date', 'Due date'),
+        ('priority', 'Priority'),
+        ('assigned_to', 'Assigned to'),
+        ('completed', 'Completed'),
+    ]
+
     title = models.CharField(max_length = 100)
     description = models.CharField(max_length = 1000)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name = 'set_by')
@@ -106,6 +195,78 @@ class Task(models.Model):
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, null=False, blank=True)
     completed = models.BooleanField(default=False, null=False)
 
+    class Meta:
+        indexes = [
+            # Team task lists filtered by completion and ordered by due date
+            models.Index(fields=['related_to_team', 'completed', 'due_date'], name='task_team_completed_due_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Load a task and snapshot the values of its tracked fields."""
+
+        task = super().from_db(db, field_names, values)
+        task._loaded_values = {field: getattr(task, field) for field, _ in cls.TRACKED_FIELDS if field in field_names}
+        return task
+
+    def save(self, *args, **kwargs):
+        """Save the task and take its saved field values as the new snapshot."""
+
+        super().save(*args, **kwargs)
+        self._loaded_values = {field: getattr(self, field) for field, _ in self.TRACKED_FIELDS if field != 'assigned_to'}
+
+    def snapshot_assignees(self):
+        """Remember who the task is assigned to, reusing prefetched assignees when available."""
+
+        self._loaded_assignees = {user.id: user.username for user in self.assigned_to.all()}
+
+    def get_changes(self, assigned_to = None):
+        """Return the tracked fields changed since the task was loaded or saved.
+
+        Each change is a dict with the field name, its display label, and
+        either its before and after values or, for assigned_to, the sorted
+        usernames added and removed. Assignees are only compared when the new
+        assignees are given and snapshot_assignees() was called beforehand.
+        """
+
+        loaded_values = getattr(self, '_loaded_values', {})
+        changes = []
+        for field, label in self.TRACKED_FIELDS:
+            if field == 'assigned_to':
+                if assigned_to is None or not hasattr(self, '_loaded_assignees'):
+                    continue
+                before = self._loaded_assignees
+                after = {user.id: user.username for user in assigned_to}
+                if before.keys() != after.keys():
+                    changes.append({
+                        'field': field,
+                        'label': label,
+                        'added': sorted(after[user_id] for user_id in after.keys() - before.keys()),
+                        'removed': sorted(before[user_id] for user_id in before.keys() - after.keys()),
+                    })
+            elif field in loaded_values and loaded_values[field] != getattr(self, field):
+                changes.append({'field': field, 'label': label, 'before': loaded_values[field], 'after': getattr(self, field)})
+        return changes
+
+    @staticmethod
+    def describe_changes(changes):
+        """Return the changes from get_changes() as text, one line per field."""
+
+        lines = []
+        for change in changes:
+            if change['field'] == 'assigned_to':
+                description = ""
+                if change['added']:
+                    description += f"Added {', '.join(change['added'])} "
+                if change['removed']:
+                    description += f"Removed {', '.join(change['removed'])} "
+                lines.append(f"{change['label']}: {description}")
+            else:
+                before = "None" if change['before'] == "" else change['before']
+                after = "None" if change['after'] == "" else change['after']
+                lines.append(f"{change['label']}: {before} to {after}")
+        return '\n'.join(lines)
+
     def days_until_due(self):
         if self.due_date:
             return (self.due_date - timezone.now().date()).days
@@ -125,4 +286,10 @@ class AuditLog(models.Model):
     action = models.CharField(max_length = 100)
     timestamp = models.DateTimeField(auto_now_add=True)
     changes = models.CharField(max_length = 2000, null = True, blank = True)
+
+    class Meta:
+        indexes = [
+            # A team's log is read, and trimmed, in id order
+            models.Index(fields=['team', 'id'], name='auditlog_team_id_idx'),
+        ]
         
@@ -0,0 +1,92 @@
+"""Keyset (cursor) pagination for ordered querysets."""
+import base64
+import binascii
+import json
+import math
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# Range of the signed 64-bit integers databases store
+MIN_INTEGER = -2 ** 63
+MAX_INTEGER = 2 ** 63 - 1
+
+
+def encode_cursor(value, pk):
+    """Return an opaque cursor pointing just after the row with the given sort value and pk."""
+
+    if value is not None and not isinstance(value, (int, float, str)):
+        value = str(value)
+    data = json.dumps([value, pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (value, pk) pair stored in a cursor, or None if the cursor is invalid."""
+
+    if not cursor:
+        return None
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk = json.loads(data)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if not is_integer(pk):
+        return None
+    # encode_cursor only ever stores these, anything else was not made by it
+    if value is not None and not (is_integer(value) or isinstance(value, str) or (isinstance(value, float) and math.isfinite(value))):
+        return None
+    return value, pk
+
+
+def is_integer(value):
+    """Return whether value is an int the database can store."""
+
+    return isinstance(value, int) and not isinstance(value, bool) and MIN_INTEGER <= value <= MAX_INTEGER
+
+
+def cursor_position(queryset, sort_field, cursor):
+    """Return the (value, pk) pair of a cursor with the value converted to the type of sort_field, or None.
+
+    Cursors come from the query string, so a cursor that was tampered with or
+    belongs to another ordering is treated as no cursor at all.
+    """
+
+    position = decode_cursor(cursor)
+    if position is None:
+        return None
+    value, pk = position
+    if value is None:
+        return position
+    if sort_field in queryset.query.annotations:
+        field = queryset.query.annotations[sort_field].output_field
+    else:
+        field = queryset.model._meta.get_field(sort_field)
+    try:
+        return field.to_python(value), pk
+    except (ValidationError, TypeError, ValueError, OverflowError):
+        return None
+
+
+def keyset_paginate(queryset, sort_field, cursor, page_size):
+    """Return one page of a queryset ordered by (sort_field, pk) and the cursor of the next page.
+
+    Rows with a NULL sort_field value are expected to come first, as in an
+    ascending order with NULLS FIRST. The next cursor is None on the last page,
+    and an invalid cursor gives the first page.
+    """
+
+    position = cursor_position(queryset, sort_field, cursor)
+    if position is not None:
+        value, pk = position
+        if value is None:
+            after = Q(**{f'{sort_field}__isnull': True, 'pk__gt': pk}) | Q(**{f'{sort_field}__isnull': False})
+        else:
+            after = Q(**{f'{sort_field}__gt': value}) | Q(**{sort_field: value, 'pk__gt': pk})
+        queryset = queryset.filter(after)
+
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_field), last.pk)
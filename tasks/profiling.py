@@ -0,0 +1,115 @@
+"""Measurement of where the time of a request goes, used by the profiling middleware."""
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from django.core.cache import caches
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+from .benchmarks import QueryTimer
+
+# Profile of the request being handled, if it is being profiled
+current_profile = ContextVar('current_profile', default = None)
+
+_MISSING = object()
+
+
+class RequestProfile:
+    """Time, SQL, template rendering and cache lookups of one request."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.queries = QueryTimer()
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @contextmanager
+    def measure(self):
+        """Record everything done inside the block in this profile."""
+
+        token = current_profile.set(self)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self.queries))
+                for cache in caches.all():
+                    stack.enter_context(self.counting_lookups(cache))
+                yield self
+        finally:
+            self.seconds = time.perf_counter() - start
+            current_profile.reset(token)
+
+    @contextmanager
+    def counting_lookups(self, cache):
+        """Count the hits and misses of cache.get inside the block."""
+
+        get = cache.get
+
+        def counted_get(key, default = None, version = None):
+            value = get(key, _MISSING, version = version)
+            if value is _MISSING:
+                self.cache_misses += 1
+                return default
+            self.cache_hits += 1
+            return value
+
+        # Another profile may be counting the lookups already, such as the metrics middleware's
+        previous = cache.__dict__.get('get')
+        cache.get = counted_get
+        try:
+            yield
+        finally:
+            if previous is None:
+                del cache.get
+            else:
+                cache.get = previous
+
+    def server_timing(self):
+        """Return the profile as the value of a Server-Timing header."""
+
+        return ', '.join([
+            f'total;dur={self.seconds * 1000:.2f}',
+            f'sql;dur={self.queries.seconds * 1000:.2f};desc="{self.queries.count} queries"',
+            f'template;dur={self.template_seconds * 1000:.2f}',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+        ])
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.seconds * 1000, 3),
+            'sql_ms': round(self.queries.seconds * 1000, 3),
+            'queries': self.queries.count,
+            'template_ms': round(self.template_seconds * 1000, 3),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+class ProfiledTemplate(Template):
+    """Django template that adds its render time to the current request's profile."""
+
+    def render(self, context = None, request = None):
+        profile = current_profile.get()
+        if profile is None:
+            return super().render(context, request)
+        # Templates rendered while rendering another are already being timed
+        profile.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template_seconds += time.perf_counter() - start
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    """Django template backend whose templates time their rendering for the profiling middleware."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
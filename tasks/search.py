@@ -0,0 +1,81 @@
+"""Full-text search of tasks by title and description."""
+import re
+from contextlib import contextmanager
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# SQLite FTS5 index over tasks_task, created and kept in sync by migration 0049
+FTS_TABLE = 'tasks_task_fts'
+
+# Same triggers as in migration 0049, dropped while tasks are bulk loaded or deleted
+FTS_BULK_TRIGGERS = {
+    f'{FTS_TABLE}_insert': (
+        f"CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON tasks_task BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description); "
+        "END"
+    ),
+    f'{FTS_TABLE}_delete': (
+        f"CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON tasks_task BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+        "END"
+    ),
+}
+
+_fts_tables = {}
+
+def fts_available(using='default'):
+    """Return True if the database has the full-text search index."""
+
+    connection = connections[using]
+    key = (using, str(connection.settings_dict['NAME']))
+    if key not in _fts_tables:
+        _fts_tables[key] = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[key]
+
+@contextmanager
+def deferred_search_index(using='default'):
+    """Stop indexing inserted and deleted tasks one by one inside the block and rebuild the index once at the end.
+
+    Much faster when inserting or deleting many tasks. Updates are still indexed as usual.
+    """
+
+    if not fts_available(using):
+        yield
+        return
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for trigger in FTS_BULK_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for create_trigger in FTS_BULK_TRIGGERS.values():
+                cursor.execute(create_trigger)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+def fts_match_expression(query):
+    """Return an FTS5 query matching every word of query as a prefix, or None if it has no words."""
+
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+def search_tasks(tasks, query):
+    """Filter tasks by query and annotate them with a search_rank, lower being more relevant."""
+
+    match = fts_match_expression(query)
+    if match and fts_available(tasks.db):
+        matching_ids = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        rank = RawSQL(
+            f'SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = tasks_task.id',
+            [match],
+            output_field=FloatField(),
+        )
+        return tasks.filter(id__in=matching_ids).annotate(search_rank=rank)
+
+    # Databases without FTS5 fall back to a substring scan that cannot be ranked
+    tasks = tasks.filter(Q(title__icontains=query) | Q(description__icontains=query))
+    return tasks.annotate(search_rank=Value(0.0, output_field=FloatField()))
@@ -0,0 +1,81 @@
+"""Logging of SQL statements slower than SLOW_QUERY_THRESHOLD_MS with the view, code and template that ran them."""
+import inspect
+import json
+import logging
+import os
+import time
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Number of frames of application code kept in each entry
+STACK_DEPTH = 5
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules wrapping query execution, whose frames say nothing about where a query came from
+WRAPPER_MODULES = {
+    os.path.join(APP_ROOT, 'tasks', name) for name in ('slow_queries.py', 'middleware.py', 'profiling.py', 'benchmarks.py')
+}
+
+
+class SlowQueryLogger:
+    """Database execute wrapper logging the statements of a request that take at least threshold seconds."""
+
+    def __init__(self, request, threshold):
+        self.request = request
+        self.threshold = threshold
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if duration >= self.threshold:
+                # The parameters of executemany() may be a generator used up by now
+                self.log(sql, None if many else params, duration)
+
+    def log(self, sql, params, duration):
+        match = self.request.resolver_match
+        frame = inspect.currentframe()
+        try:
+            entry = {
+                'time': timezone.now().isoformat(),
+                'view': match.view_name if match else None,
+                'path': self.request.path,
+                'duration_ms': round(duration * 1000, 3),
+                'sql': sql,
+                'params': params,
+                'stack': application_stack(frame),
+                'template': rendering_template(frame),
+            }
+        finally:
+            del frame
+        logger.warning(json.dumps(entry, default = str))
+
+
+def application_stack(frame):
+    """Return the innermost STACK_DEPTH frames of application code from frame outwards, outermost first."""
+
+    lines = []
+    while frame is not None and len(lines) < STACK_DEPTH:
+        path = frame.f_code.co_filename
+        if path.startswith(APP_ROOT + os.sep) and 'site-packages' not in path and path not in WRAPPER_MODULES:
+            lines.append(f'{os.path.relpath(path, APP_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}')
+        frame = frame.f_back
+    return lines[::-1]
+
+
+def rendering_template(frame):
+    """Return 'template name:line' of the template tag or variable being rendered at frame, or None outside templates."""
+
+    while frame is not None:
+        if frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                return f'{origin.template_name}:{token.lineno}'
+        frame = frame.f_back
+    return None
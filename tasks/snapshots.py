@@ -0,0 +1,49 @@
+"""Saving and restoring whole SQLite databases with SQLite's online backup API."""
+import os
+import sqlite3
+from pathlib import Path
+from django.core.cache import cache
+from django.db import connections
+
+
+def get_sqlite_connection(using):
+    """Return the open sqlite3 connection of a database, or raise ValueError for other databases."""
+
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        raise ValueError(f'Snapshots need an SQLite database, {using} is {connection.vendor}.')
+    connection.ensure_connection()
+    return connection.connection
+
+
+def save_snapshot(path, using='default'):
+    """Copy the database to the file at path, replacing it."""
+
+    source = get_sqlite_connection(using)
+    temporary_path = f'{path}.tmp'
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+    destination = sqlite3.connect(temporary_path)
+    try:
+        source.backup(destination)
+    finally:
+        destination.close()
+    os.replace(temporary_path, path)
+
+
+def restore_snapshot(path, using='default'):
+    """Replace the whole database with the snapshot at path.
+
+    The cache is cleared too, since anything cached was computed from the old data.
+    """
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    destination = get_sqlite_connection(using)
+    # Characters such as ? # and % in the path must be escaped in the URI
+    source = sqlite3.connect(Path(path).resolve().as_uri() + '?mode=ro', uri=True)
+    try:
+        source.backup(destination)
+    finally:
+        source.close()
+    cache.clear()
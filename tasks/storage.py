@@ -0,0 +1,39 @@
+"""Static files storage that builds the asset bundles and precompresses text files in collectstatic."""
+import json
+import logging
+from django.conf import settings
+from django.contrib.staticfiles.storage import StaticFilesStorage
+from django.core.files.base import ContentFile
+from .assets import BUNDLE_MANIFEST_NAME, COMPRESSIBLE_EXTENSIONS, build_bundle, compress_static
+
+logger = logging.getLogger(__name__)
+
+
+class BundledStaticFilesStorage(StaticFilesStorage):
+    """Build ASSET_BUNDLES into content-hashed files and write .gz/.br copies of every text file.
+
+    Bundles with a part that was not collected, such as a vendor file that
+    was never downloaded, are skipped so the templates keep using the parts.
+    """
+
+    def post_process(self, paths, dry_run = False, **options):
+        if dry_run:
+            return
+
+        bundles = {}
+        for bundle, parts in settings.ASSET_BUNDLES.items():
+            missing = [part for part in parts if part not in paths]
+            if missing:
+                logger.warning('Not bundling %s, missing %s', bundle, ', '.join(missing))
+                continue
+            bundles[bundle] = build_bundle(self, bundle, parts)
+            yield bundle, bundles[bundle], True
+
+        if self.exists(BUNDLE_MANIFEST_NAME):
+            self.delete(BUNDLE_MANIFEST_NAME)
+        self.save(BUNDLE_MANIFEST_NAME, ContentFile(json.dumps(bundles, indent = 2).encode()))
+
+        for name in [*paths, *bundles.values()]:
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                for compressed_name in compress_static(self, name):
+                    yield name, compressed_name, True
@@ -0,0 +1,30 @@
+"""Template tags that include the CSS and JavaScript bundles."""
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from tasks.assets import bundle_parts, load_bundle_manifest
+
+register = template.Library()
+
+
+def asset_tag(bundle, url, integrity = None):
+    integrity_html = format_html(' integrity="{}" crossorigin="anonymous"', integrity) if integrity else ''
+    if bundle.endswith('.css'):
+        return format_html('<link href="{}" rel="stylesheet"{}>', url, integrity_html)
+    return format_html('<script src="{}"{}></script>', url, integrity_html)
+
+
+@register.simple_tag
+def asset_bundle(bundle):
+    """Include a bundle from ASSET_BUNDLES.
+
+    Once collectstatic has built the bundle this is a single hashed file,
+    otherwise each part is included on its own, from the CDN if it was not vendored.
+    """
+
+    built = load_bundle_manifest().get(bundle)
+    if built:
+        return asset_tag(bundle, static(built))
+    return format_html_join('\n    ', '{}', (
+        (asset_tag(bundle, cdn_url or static(part), integrity),) for part, cdn_url, integrity in bundle_parts(bundle)
+    ))
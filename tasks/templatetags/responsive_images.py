@@ -0,0 +1,68 @@
+"""Template tags that pick the generated variants of a static image."""
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from tasks.images import get_image_variants, variant_url
+
+register = template.Library()
+
+
+def pick_variant(variants, width):
+    """Return the path of the narrowest variant at least width wide, or the widest one."""
+
+    for variant_width, path in variants:
+        if variant_width >= width:
+            return path
+    return variants[-1][1]
+
+
+def srcset(variants):
+    return ', '.join(f'{variant_url(path)} {width}w' for width, path in variants)
+
+
+@register.simple_tag
+def responsive_image(source, sizes = '100vw', **attributes):
+    """Render a <picture> offering every generated variant of a static image.
+
+    Falls back to a plain <img> of the original when no variants were generated.
+    Extra keyword arguments become attributes of the <img>.
+    """
+
+    entry = get_image_variants(source)
+    attribute_html = format_html_join('', ' {}="{}"', attributes.items())
+    if entry is None:
+        return format_html('<img src="{}"{}>', static(source), attribute_html)
+
+    fallback = entry['variants'][entry['fallback']]
+    width = int(attributes.get('width', entry['width']))
+    source_html = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((mime_type, srcset(variants), sizes) for mime_type, variants in entry['variants'].items() if mime_type != entry['fallback'])
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        source_html, variant_url(pick_variant(fallback, width)), srcset(fallback), sizes, attribute_html
+    )
+
+
+@register.simple_tag
+def image_url(source, width):
+    """Return the URL of the fallback variant of a static image closest to width, or of the original."""
+
+    entry = get_image_variants(source)
+    if entry is None:
+        return static(source)
+    return variant_url(pick_variant(entry['variants'][entry['fallback']], width))
+
+
+@register.simple_tag
+def image_set(source, width):
+    """Return a CSS image-set() offering every format of a static image at about width pixels wide."""
+
+    entry = get_image_variants(source)
+    if entry is None:
+        return format_html('image-set(url("{}"))', static(source))
+    return format_html('image-set({})', format_html_join(
+        ', ', 'url("{}") type("{}")',
+        ((variant_url(pick_variant(variants, width)), mime_type) for mime_type, variants in entry['variants'].items())
+    ))
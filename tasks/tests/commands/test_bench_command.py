@@ -0,0 +1,94 @@
+"""Tests of the bench command."""
+import json
+import os
+import shutil
+import tempfile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from io import StringIO
+from tasks.benchmarks import find_regressions, percentile
+from tasks.models import AuditLog, Task, Team
+from unittest.mock import patch
+
+class BenchCommandTestCase(TestCase):
+    """Tests of the bench command."""
+
+    VIEWS = [
+        'dashboard', 'team_page', 'task_search?order_by=due_date', 'task_search?order_by=title',
+        'task_search?order_by=priority', 'task_search?order_by=relevance', 'view_task', 'edit_task', 'update_task_completion',
+    ]
+
+    def setUp(self):
+        with patch('builtins.print'):
+            call_command('seed', users=10, seed=1)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.output = os.path.join(directory, 'bench.json')
+
+    def _bench(self, **options):
+        call_command('bench', users=2, iterations=2, warmup=0, stdout=StringIO(), stderr=StringIO(), **options)
+
+    def _results(self):
+        with open(self.output) as output:
+            return json.load(output)
+
+    def test_bench_writes_statistics_of_every_view(self):
+        self._bench(output=self.output)
+        results = self._results()
+        self.assertEqual(results['users'], 2)
+        self.assertEqual(list(results['views']), self.VIEWS)
+        for stats in results['views'].values():
+            self.assertEqual(stats['requests'], 4)
+            self.assertLessEqual(stats['p50_ms'], stats['p95_ms'])
+            self.assertLessEqual(stats['p95_ms'], stats['p99_ms'])
+            self.assertGreater(stats['queries'], 0)
+        self.assertGreater(results['views']['dashboard']['bytes'], 0)
+
+    def test_bench_leaves_the_data_unchanged(self):
+        tasks = list(Task.objects.order_by('id').values_list('id', 'completed', 'due_date'))
+        revisions = list(Team.objects.order_by('team_id').values_list('revision', flat=True))
+        log_count = AuditLog.objects.count()
+        self._bench()
+        self.assertEqual(list(Task.objects.order_by('id').values_list('id', 'completed', 'due_date')), tasks)
+        self.assertEqual(list(Team.objects.order_by('team_id').values_list('revision', flat=True)), revisions)
+        self.assertEqual(AuditLog.objects.count(), log_count)
+
+    def test_bench_fails_on_regression_from_baseline(self):
+        self._bench(output=self.output)
+        baseline = self._results()
+        for stats in baseline['views'].values():
+            stats['queries'] -= 1
+        with open(self.output, 'w') as output:
+            json.dump(baseline, output)
+        with self.assertRaisesMessage(CommandError, 'regressions'):
+            self._bench(baseline=self.output)
+
+    def test_bench_passes_against_a_slower_baseline(self):
+        self._bench(output=self.output)
+        baseline = self._results()
+        for stats in baseline['views'].values():
+            stats['p50_ms'] = stats['p95_ms'] = 1e9
+        with open(self.output, 'w') as output:
+            json.dump(baseline, output)
+        self._bench(baseline=self.output)
+
+    def test_bench_needs_tasks(self):
+        Task.objects.all().delete()
+        with self.assertRaises(CommandError):
+            self._bench()
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+
+    def test_find_regressions_uses_threshold(self):
+        baseline = {'dashboard': {'p50_ms': 10, 'p95_ms': 20, 'queries': 5}}
+        self.assertEqual(find_regressions({'dashboard': {'p50_ms': 11, 'p95_ms': 23, 'queries': 5}}, baseline, 0.2), [])
+        self.assertEqual(
+            find_regressions({'dashboard': {'p50_ms': 13, 'p95_ms': 20, 'queries': 6}}, baseline, 0.2),
+            ['dashboard: p50_ms 10 -> 13', 'dashboard: queries 5 -> 6'],
+        )
+        self.assertEqual(find_regressions({'team_page': {'p50_ms': 99, 'p95_ms': 99, 'queries': 99}}, baseline, 0.2), [])
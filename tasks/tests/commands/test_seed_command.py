@@ -0,0 +1,93 @@
+"""Tests of the seed command."""
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase
+from tasks.models import AuditLog, Invites, Task, Team, User, hash_email
+from tasks.management.commands.seed import Command
+from tasks.search import search_tasks
+from unittest.mock import patch
+
+class SeedCommandTestCase(TestCase):
+    """Tests of the seed command."""
+
+    def _seed(self, **options):
+        with patch('builtins.print'):
+            call_command('seed', **options)
+
+    def test_seed_creates_the_requested_number_of_valid_users(self):
+        self._seed(users=40, batch_size=15)
+        self.assertEqual(User.objects.count(), 40)
+        john = User.objects.get(username='@johndoe')
+        self.assertTrue(john.is_superuser and john.is_staff)
+        for user in User.objects.all():
+            user.full_clean()
+            self.assertEqual(user.email_hash, hash_email(user.email))
+
+    def test_password_is_hashed_once(self):
+        with patch('tasks.management.commands.seed.make_password', wraps=make_password) as make_password_mock:
+            self._seed(users=20)
+        make_password_mock.assert_called_once()
+        self.assertTrue(check_password('Password123', User.objects.get(username='@charlie').password))
+
+    def test_seeded_teams_tasks_and_logs_are_consistent(self):
+        self._seed(users=30, teams_per_user=2, tasks_per_user=2, invites_per_user=3, batch_size=7)
+        self.assertTrue(Team.objects.filter(team_name='Seeded team', team_leader__username='@johndoe').exists())
+        self.assertEqual(Team.objects.filter(team_leader__username='@johndoe').count(), 1)
+        for team in Team.objects.annotate(member_count=Count('team_members')):
+            self.assertTrue(team.team_members.filter(id=team.team_leader_id).exists())
+            self.assertGreaterEqual(team.member_count, 2)
+        self.assertTrue(Task.objects.exists())
+        self.assertFalse(Task.objects.filter(assigned_to__isnull=True).exists())
+        self.assertEqual(Task.objects.filter(assigned_to=F('created_by'), related_to_team__team_members=F('created_by')).count(), Task.objects.count())
+        self.assertTrue(Invites.objects.exists())
+        for row in AuditLog.objects.values('team').annotate(count=Count('id')):
+            self.assertLessEqual(row['count'], settings.AUDIT_LOG_RETENTION)
+
+    def _dataset(self):
+        return {
+            'users': list(User.objects.order_by('username').values_list('username', 'email', 'password', 'date_joined')),
+            'teams': list(Team.objects.order_by('team_id').values_list('team_name', 'team_description', 'team_leader__username')),
+            'tasks': list(Task.objects.order_by('id').values_list('title', 'due_date', 'priority', 'completed', 'created_by__username', 'related_to_team__team_name')),
+            'invites': list(Invites.objects.order_by('id').values_list('username__username', 'team__team_name')),
+            'logs': list(AuditLog.objects.order_by('id').values_list('username__username', 'task_title', 'timestamp')),
+        }
+
+    def test_seeded_datasets_are_identical(self):
+        self._seed(users=25, seed=42)
+        first = self._dataset()
+        User.objects.all().delete()
+        self._seed(users=25, seed=42)
+        self.assertEqual(self._dataset(), first)
+        User.objects.all().delete()
+        self._seed(users=25, seed=43)
+        self.assertNotEqual(self._dataset()['users'], first['users'])
+
+    def test_profile_sets_the_dataset_size(self):
+        with patch.dict(Command.PROFILES, {'small': {'users': 12, 'teams_per_user': 1, 'tasks_per_user': 1, 'invites_per_user': 1}}):
+            self._seed(profile='small')
+        self.assertEqual(User.objects.count(), 12)
+        teams = Team.objects.exclude(team_name='Seeded team').annotate(task_count=Count('team_tasks'))
+        self.assertEqual(len(teams), 11)
+        self.assertTrue(all(team.task_count == 2 for team in teams))
+
+    def test_flags_override_the_profile(self):
+        self._seed(profile='large', users=15)
+        self.assertEqual(User.objects.count(), 15)
+
+    def test_seeding_again_tops_the_data_up(self):
+        self._seed(users=10)
+        teams = Team.objects.count()
+        self._seed(users=25)
+        self.assertEqual(User.objects.count(), 25)
+        self.assertGreater(Team.objects.count(), teams)
+        self.assertEqual(Team.objects.filter(team_name='Seeded team').count(), 1)
+        self.assertFalse(User.objects.exclude(username='@johndoe').filter(member_of_team__isnull=True).exists())
+
+    def test_seeded_tasks_are_searchable(self):
+        self._seed(users=10)
+        task = Task.objects.first()
+        self.assertIn(task, search_tasks(Task.objects.all(), task.title))
+        Task.objects.create(title='Zanzibar expedition', description='', created_by=task.created_by, related_to_team=task.related_to_team)
+        self.assertEqual(search_tasks(Task.objects.all(), 'zanzibar').count(), 1)
@@ -0,0 +1,58 @@
+"""Tests of the snapshot command."""
+import os
+import shutil
+import tempfile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase
+from io import StringIO
+from tasks.models import Team, User
+
+class SnapshotCommandTestCase(TransactionTestCase):
+    """Tests of the snapshot command."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'snapshot.sqlite3')
+        self.user = User.objects.create_user('@snapshot', email='snapshot@example.org', password='Password123', first_name='Snap', last_name='Shot')
+        Team.objects.create(team_leader=self.user, team_name='Saved')
+
+    def _snapshot(self, *args):
+        output = StringIO()
+        call_command('snapshot', *args, stdout=output)
+        return output.getvalue()
+
+    def test_save_and_restore(self):
+        self.assertIn('Saved', self._snapshot('save', self.path))
+        self.assertTrue(os.path.exists(self.path))
+
+        Team.objects.all().delete()
+        User.objects.create_user('@later', email='later@example.org', first_name='Lat', last_name='Er')
+        cache.set('stale', 1)
+
+        self.assertIn('Restored', self._snapshot('restore', self.path))
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['@snapshot'])
+        self.assertEqual(list(Team.objects.values_list('team_name', flat=True)), ['Saved'])
+        self.assertIsNone(cache.get('stale'))
+
+    def test_save_replaces_an_existing_snapshot(self):
+        self._snapshot('save', self.path)
+        User.objects.create_user('@later', email='later@example.org', first_name='Lat', last_name='Er')
+        self._snapshot('save', self.path)
+        User.objects.filter(username='@later').delete()
+        self._snapshot('restore', self.path)
+        self.assertTrue(User.objects.filter(username='@later').exists())
+
+    def test_restore_snapshot_with_uri_characters_in_its_path(self):
+        self.path = os.path.join(os.path.dirname(self.path), 'what? #1 100%.sqlite3')
+        self._snapshot('save', self.path)
+        Team.objects.all().delete()
+        self._snapshot('restore', self.path)
+        self.assertEqual(list(Team.objects.values_list('team_name', flat=True)), ['Saved'])
+
+    def test_restore_missing_snapshot(self):
+        with self.assertRaises(CommandError):
+            self._snapshot('restore', self.path)
+        self.assertTrue(User.objects.filter(username='@snapshot').exists())
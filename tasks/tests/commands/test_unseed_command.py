@@ -0,0 +1,64 @@
+"""Tests of the unseed command."""
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from io import StringIO
+from tasks.models import AuditLog, Invites, Task, Team, User
+from tasks.search import search_tasks
+from unittest.mock import patch
+
+class UnseedCommandTestCase(TestCase):
+    """Tests of the unseed command."""
+
+    def setUp(self):
+        with patch('builtins.print'):
+            call_command('seed', users=20, seed=1)
+        self.staff = User.objects.get(username='@johndoe')
+        self.staff_task = Task.objects.create(title='Staff only', description='', created_by=self.staff)
+
+    def _unseed(self, **options):
+        output = StringIO()
+        call_command('unseed', stdout=output, **options)
+        return output.getvalue()
+
+    def test_unseed_deletes_seeded_data(self):
+        self.assertTrue(AuditLog.objects.exists())
+        self._unseed(batch_size=7)
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['@johndoe'])
+        self.assertFalse(Team.objects.exists())
+        self.assertFalse(Invites.objects.exists())
+        self.assertFalse(AuditLog.objects.exists())
+        self.assertFalse(Team.team_members.through.objects.exists())
+        self.assertEqual(list(Task.objects.all()), [self.staff_task])
+
+    def test_unseed_reports_deleted_rows_per_table(self):
+        tasks = Task.objects.count() - 1
+        users = User.objects.count() - 1
+        output = self._unseed()
+        self.assertIn(f'tasks_task: {tasks} rows deleted', output)
+        self.assertIn(f'tasks_user: {users} rows deleted', output)
+        self.assertIn('tasks_auditlog:', output)
+
+    def test_search_index_follows_deleted_tasks(self):
+        title = Task.objects.exclude(id=self.staff_task.id).first().title
+        self._unseed()
+        self.assertFalse(search_tasks(Task.objects.all(), title).exists())
+        self.assertEqual(list(search_tasks(Task.objects.all(), 'staff')), [self.staff_task])
+
+    def test_unseed_clears_the_cache(self):
+        cache.set('dashboard', 'stale')
+        self._unseed()
+        self.assertIsNone(cache.get('dashboard'))
+
+    def test_unseed_only_loads_batches_of_ids(self):
+        tasks = Task.objects.count()
+        with CaptureQueriesContext(connection) as queries:
+            self._unseed(batch_size=5)
+        statements = [query['sql'] for query in queries]
+        selects = [sql for sql in statements if sql.startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertRegex(sql, r'^SELECT "\w+" FROM "\w+" WHERE .* LIMIT 5$')
+        self.assertGreater(len([sql for sql in statements if sql.startswith('DELETE')]), tasks // 5)
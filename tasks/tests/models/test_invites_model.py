@@ -44,9 +44,14 @@ class InvitesModelTestCase(TestCase):
             empty_username_invite = Invites.objects.create(username=None, team_id=self.team.team_id)
 
     def test_team_member_can_have_multiple_invites(self):
-        Invites.objects.create(username=self.team_member, team_id=2)
+        other_team = Team.objects.create(team_leader=self.team_leader, team_name='Other team')
+        Invites.objects.create(username=self.team_member, team_id=other_team.team_id)
         self.assertEqual(Invites.objects.filter(username=self.team_member).count(), 2)
 
     def test_team_member_can_only_have_one_invite_per_team(self):
         with self.assertRaises(IntegrityError):
-            Invites.objects.create(username=self.team_member, team_id=self.team.team_id)
\ No newline at end of file
+            Invites.objects.create(username=self.team_member, team_id=self.team.team_id)
+
+    def test_invites_are_deleted_with_their_team(self):
+        self.team.delete()
+        self.assertFalse(Invites.objects.filter(pk=self.invite.pk).exists())
@@ -92,3 +92,29 @@ class TaskTest(TestCase):
         except ValidationError:
             self.fail("Task can be completed")
             
+
+    def test_get_changes_reports_changed_fields_since_load(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.title = 'New title'
+        task.priority = 'high'
+        changes = task.get_changes()
+        self.assertEqual(changes, [
+            {'field': 'title', 'label': 'Title', 'before': 'Task title', 'after': 'New title'},
+            {'field': 'priority', 'label': 'Priority', 'before': '', 'after': 'high'},
+        ])
+        self.assertEqual(Task.describe_changes(changes), 'Title: Task title to New title\nPriority: None to high')
+
+    def test_get_changes_is_empty_after_save(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.completed = True
+        task.save()
+        self.assertEqual(task.get_changes(), [])
+
+    def test_get_changes_reports_assignees_without_extra_queries(self):
+        second_user = User.objects.create_user('@janedoe', email='jane.doe@example.org', password='Password123', first_name='Jane', last_name='Doe')
+        task = Task.objects.prefetch_related('assigned_to').get(pk=self.task.pk)
+        with self.assertNumQueries(0):
+            task.snapshot_assignees()
+            changes = task.get_changes([second_user])
+        self.assertEqual(changes, [{'field': 'assigned_to', 'label': 'Assigned to', 'added': ['@janedoe'], 'removed': ['@johndoe']}])
+        self.assertEqual(Task.describe_changes(changes), 'Assigned to: Added @janedoe Removed @johndoe ')
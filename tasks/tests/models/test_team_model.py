@@ -1,6 +1,8 @@
 from django.core.exceptions import ValidationError
+from django.db import connection
 from django.test import TestCase
-from tasks.models import User, Team
+from django.test.utils import CaptureQueriesContext
+from tasks.models import User, Team, Task
 
 
 class TeamModelTestCase(TestCase):
@@ -21,6 +23,51 @@ class TeamModelTestCase(TestCase):
         )
         self.team.team_members.set([self.user])
 
+    def _create_tasks(self, count, assignees):
+        tasks = Task.objects.bulk_create(
+            Task(
+                title=f'Task {i}',
+                description='Description of the task',
+                created_by=self.user,
+                related_to_team=self.team,
+            )
+            for i in range(count)
+        )
+        Task.assigned_to.through.objects.bulk_create(
+            Task.assigned_to.through(task=task, user=user) for task in tasks for user in assignees
+        )
+
+    def test_remove_member_deletes_only_tasks_left_unassigned(self):
+        self.team.team_members.add(self.second_user)
+        self._create_tasks(2, [self.second_user])
+        self._create_tasks(3, [self.user, self.second_user])
+        self.team.remove_member(self.second_user)
+        self.assertNotIn(self.second_user, self.team.team_members.all())
+        self.assertEqual(Task.objects.filter(related_to_team=self.team).count(), 3)
+        self.assertFalse(Task.objects.filter(assigned_to=self.second_user).exists())
+
+    def test_remove_member_query_count_does_not_grow_with_tasks(self):
+        self.team.team_members.add(self.second_user)
+        self._create_tasks(1, [self.second_user])
+        with CaptureQueriesContext(connection) as few_tasks:
+            self.team.remove_member(self.second_user)
+        self.team.team_members.add(self.second_user)
+        self._create_tasks(1000, [self.second_user])
+        self._create_tasks(1000, [self.user, self.second_user])
+        with CaptureQueriesContext(connection) as many_tasks:
+            self.team.remove_member(self.second_user)
+        self.assertEqual(len(few_tasks), len(many_tasks))
+        self.assertEqual(Task.objects.filter(related_to_team=self.team).count(), 1000)
+
+    def test_delete_tasks_deletes_only_the_teams_tasks(self):
+        other_team = Team.objects.create(team_leader=self.user, team_name='Other team')
+        other_task = Task.objects.create(title='Other', description='', created_by=self.user, related_to_team=other_team)
+        other_task.assigned_to.set([self.user])
+        self._create_tasks(3, [self.user, self.second_user])
+        Team.delete_tasks(self.team.team_id)
+        self.assertFalse(Task.objects.filter(related_to_team=self.team).exists())
+        self.assertEqual(list(Task.assigned_to.through.objects.values_list('task_id', flat=True)), [other_task.id])
+
     def test_valid_team(self):
         self._assert_team_is_valid()
 
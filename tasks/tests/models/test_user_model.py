@@ -1,7 +1,8 @@
 """Unit tests for the User model."""
 from django.core.exceptions import ValidationError
-from django.test import TestCase
-from tasks.models import User
+from django.test import TestCase, override_settings
+from unittest.mock import patch
+from tasks.models import User, hash_email
 
 class UserModelTestCase(TestCase):
     """Unit tests for the User model."""
@@ -196,6 +197,32 @@ class UserModelTestCase(TestCase):
         expected_gravatar_url = self._gravatar_url(size=60)
         self.assertEqual(actual_gravatar_url, expected_gravatar_url)
 
+    def test_email_hash_is_stored_on_save(self):
+        self.user.save()
+        self.assertEqual(self.user.email_hash, '363c1b0cd64dadffb867236a00e62986')
+        self.assertEqual(User.objects.get(pk=self.user.pk).email_hash, '363c1b0cd64dadffb867236a00e62986')
+
+    def test_email_hash_follows_email_changes(self):
+        self.user.email = ' Jane.Smith@Example.org '
+        self.user.save()
+        self.assertEqual(self.user.email_hash, hash_email('jane.smith@example.org'))
+        self.assertIn(self.user.email_hash, User.objects.get(pk=self.user.pk).gravatar())
+
+    def test_email_is_not_hashed_again_when_unchanged(self):
+        self.user.save()
+        user = User.objects.get(pk=self.user.pk)
+        with patch('tasks.models.hash_email') as hash_email_mock:
+            user.first_name = 'Johnny'
+            user.save()
+            user.gravatar()
+            user.mini_gravatar()
+        hash_email_mock.assert_not_called()
+
+    @override_settings(AVATAR_MODE = 'identicon')
+    def test_identicon_gravatar(self):
+        self.assertEqual(self.user.gravatar(), '/avatar/363c1b0cd64dadffb867236a00e62986/120.png')
+        self.assertEqual(self.user.mini_gravatar(), '/avatar/363c1b0cd64dadffb867236a00e62986/60.png')
+
     def _gravatar_url(self, size):
         gravatar_url = f"{UserModelTestCase.GRAVATAR_URL}?size={size}&default=mp"
         return gravatar_url
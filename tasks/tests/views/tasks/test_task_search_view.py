@@ -1,9 +1,15 @@
 """Tests of the task_search view."""
-from django.test import TestCase
+import base64
+import json
+from django.db.models import QuerySet
+from django.test import RequestFactory, TestCase, override_settings
+from django.http import QueryDict
 from django.urls import reverse
 from datetime import datetime, timedelta
+from unittest.mock import patch
 from tasks.models import User, Task, Team
 from tasks.forms import TaskForm
+from tasks.views import get_filtered_tasks
 
 class TaskSearchViewTestCase(TestCase):
     """Unit tests of the task_search view."""
@@ -140,6 +146,26 @@ class TaskSearchViewTestCase(TestCase):
         index_new_task = content.find('New task')
         self.assertLess(index_new_task, index_test_task)
 
+    def test_order_by_priority_is_done_in_the_database(self):
+        self.client.login(username=self.user.username, password='Password123')
+        for priority in ['', 'medium', 'high']:
+            task = Task.objects.create(
+                title = f'Task with priority {priority or "none"}',
+                description = 'This is a new test task',
+                created_by = self.user,
+                related_to_team = self.team,
+                priority = priority,
+            )
+            task.assigned_to.set([self.user])
+
+        request = RequestFactory().get(self.url, {'order_by': 'priority'})
+        request.user = self.user
+        self.assertIsInstance(get_filtered_tasks(request), QuerySet)
+
+        response = self.client.get(self.url, {'order_by': 'priority'})
+        tasks = response.context['tasks']
+        self.assertEqual([task.priority for task in tasks], ['high', 'medium', 'low', ''])
+
     def test_order_by_due_date(self):
         self.client.login(username=self.user.username, password='Password123')
         new_task = Task.objects.create(
@@ -179,3 +205,121 @@ class TaskSearchViewTestCase(TestCase):
         self.assertNotContains(response, 'New task')
         self.assertContains(response, 'Test task')
 
+    @override_settings(TASKS_PAGE_SIZE=2)
+    def test_pages_cover_every_task_once_in_each_order(self):
+        self.client.login(username=self.user.username, password='Password123')
+        for i, priority in enumerate(['high', 'low', 'medium', '', 'high']):
+            task = Task.objects.create(
+                title = f'Paged task {i % 2}',
+                description = 'This is a paged test task',
+                created_by = self.user,
+                related_to_team = self.team,
+                due_date = (datetime.now().date() + timedelta(days=i % 3)) if i % 4 else None,
+                priority = priority,
+            )
+            task.assigned_to.set([self.user])
+        all_tasks = set(Task.objects.filter(title__startswith='Paged'))
+
+        for order_by in ['due_date', 'title', 'priority', 'relevance']:
+            seen = []
+            params = {'order_by': order_by, 'q': 'paged'}
+            while True:
+                response = self.client.get(self.url, params)
+                self.assertLessEqual(len(response.context['tasks']), 2)
+                seen.extend(response.context['tasks'])
+                next_page = response.context['pagination']['next']
+                if not next_page:
+                    break
+                params = QueryDict(next_page)
+                self.assertEqual(params['order_by'], order_by)
+            self.assertEqual(len(seen), len(all_tasks))
+            self.assertEqual(set(seen), all_tasks)
+
+    @override_settings(TASKS_PAGE_SIZE=1)
+    def test_next_page_link_keeps_filters(self):
+        self.client.login(username=self.user.username, password='Password123')
+        new_task = Task.objects.create(
+            title = 'Test task two',
+            description = 'This is a new test task',
+            created_by = self.user,
+            related_to_team = self.team,
+        )
+        new_task.assigned_to.set([self.user])
+
+        response = self.client.get(self.url, {'q': 'Test', 'team': self.team.team_id, 'completed': 'on'})
+        next_page = QueryDict(response.context['pagination']['next'])
+        self.assertEqual(next_page['q'], 'Test')
+        self.assertEqual(next_page['team'], str(self.team.team_id))
+        self.assertEqual(next_page['completed'], 'on')
+        self.assertIn('cursor', next_page)
+
+    def test_invalid_cursor_shows_first_page(self):
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Test task')
+
+    def test_cursor_with_wrong_value_type_shows_first_page(self):
+        self.client.login(username=self.user.username, password='Password123')
+        cursors = [
+            ('due_date', 'not-a-date', 1),
+            ('due_date', [2024, 1, 1], 1),
+            ('priority', 'high', 1),
+            ('relevance', 'most', 1),
+            ('title', {'title': 'Test'}, 1),
+            ('title', 'a', 10 ** 20),
+            ('priority', 10 ** 20, 1),
+            ('priority', -10 ** 20, 1),
+            ('priority', float('inf'), 1),
+            ('relevance', float('nan'), 1),
+        ]
+        for order_by, value, pk in cursors:
+            with self.subTest(order_by=order_by, value=value, pk=pk):
+                params = {'order_by': order_by, 'q': 'Test'}
+                first_page = self.client.get(self.url, params)
+                cursor = base64.urlsafe_b64encode(json.dumps([value, pk]).encode()).decode()
+                response = self.client.get(self.url, {**params, 'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['tasks']), list(first_page.context['tasks']))
+
+    def test_search_orders_by_relevance(self):
+        self.client.login(username=self.user.username, password='Password123')
+        new_task = Task.objects.create(
+            title = 'Report report report',
+            description = 'Write the report',
+            created_by = self.user,
+            related_to_team = self.team,
+        )
+        new_task.assigned_to.set([self.user])
+        other_task = Task.objects.create(
+            title = 'Meeting',
+            description = 'Discuss the long quarterly report with everyone in the team',
+            created_by = self.user,
+            related_to_team = self.team,
+        )
+        other_task.assigned_to.set([self.user])
+
+        response = self.client.get(self.url, {'q': 'report', 'order_by': 'relevance'})
+        self.assertEqual(list(response.context['tasks']), [new_task, other_task])
+
+    def test_search_index_follows_task_edits_and_deletes(self):
+        self.client.login(username=self.user.username, password='Password123')
+        self.task.title = 'Renamed chore'
+        self.task.save()
+        response = self.client.get(self.url, {'q': 'chore'})
+        self.assertIn(self.task, response.context['tasks'])
+
+        self.task.delete()
+        response = self.client.get(self.url, {'q': 'chore'})
+        self.assertEqual(len(response.context['tasks']), 0)
+
+    def test_search_matches_word_prefixes(self):
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(self.url, {'q': 'tes'})
+        self.assertIn(self.task, response.context['tasks'])
+
+    def test_search_falls_back_to_icontains_without_index(self):
+        self.client.login(username=self.user.username, password='Password123')
+        with patch('tasks.search.fts_available', return_value=False):
+            response = self.client.get(self.url, {'q': 'est tas', 'order_by': 'relevance'})
+        self.assertIn(self.task, response.context['tasks'])
@@ -1,6 +1,8 @@
 """Tests of the team_page view."""
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from tasks.models import User, Team, Task
 
@@ -79,5 +81,48 @@ class TeamPageViewTestCase(TestCase):
         self.assertIn(new_task, response.context['tasks'])
         self.assertNotIn(self.task, response.context['tasks'])
 
-    
+    def test_team_page_shows_edit_link_only_for_creator_or_assignee(self):
+        self.client.login(username=self.second_user.username, password='Password123')
+        self.team.team_members.add(self.second_user)
+        response = self.client.get(self.url)
+        self.assertNotContains(response, reverse('edit_task', kwargs={'task_id': self.task.id}))
+        self.task.assigned_to.add(self.second_user)
+        response = self.client.get(self.url)
+        self.assertContains(response, reverse('edit_task', kwargs={'task_id': self.task.id}))
+
+    def test_team_page_query_count_does_not_grow_with_tasks(self):
+        self.client.login(username=self.user.username, password='Password123')
+        self.team.team_members.add(self.second_user)
+        with CaptureQueriesContext(connection) as few_tasks:
+            self.client.get(self.url)
+        for i in range(20):
+            task = Task.objects.create(
+                title=f'Extra task {i}',
+                description='This is an extra task',
+                created_by=self.second_user,
+                related_to_team=self.team,
+            )
+            task.assigned_to.set([self.user, self.second_user])
+        with CaptureQueriesContext(connection) as many_tasks:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.context['tasks']), 21)
+        self.assertEqual(len(few_tasks), len(many_tasks))
 
+    def test_unchanged_team_page_is_not_modified(self):
+        self.client.login(username=self.user.username, password='Password123')
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        with self.assertNumQueries(3):
+            # Session, user and team revision only
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_team_page_changes_etag_after_task_mutation(self):
+        self.client.login(username=self.user.username, password='Password123')
+        self.client.get(self.url)
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(reverse('update_task_completion', kwargs={'task_id': self.task.id}), {'completed': 'on'})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
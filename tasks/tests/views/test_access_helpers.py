@@ -0,0 +1,68 @@
+"""Tests of the team and task access helpers."""
+from django.test import RequestFactory, TestCase
+from tasks.helpers import get_task_access, get_team_access
+from tasks.models import User, Team, Task
+
+class AccessHelpersTestCase(TestCase):
+    """Unit tests of get_team_access and get_task_access."""
+
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+        'tasks/tests/fixtures/other_users.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+        self.second_user = User.objects.get(username='@janedoe')
+
+        self.team = Team.objects.create(
+            team_name='Test team',
+            team_description='This is a test team',
+            team_leader=self.user
+        )
+        self.team.team_members.set([self.user, self.second_user])
+
+        self.task = Task.objects.create(
+            title='Test task',
+            description='This is a test task',
+            created_by=self.user,
+            related_to_team=self.team,
+        )
+        self.task.assigned_to.set([self.user])
+
+    def _request(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return request
+
+    def test_task_access_is_one_query_and_memoized(self):
+        request = self._request(self.second_user)
+        with self.assertNumQueries(1):
+            task = get_task_access(request, self.task.id)
+            self.assertEqual(task.related_to_team, self.team)
+            self.assertIs(get_task_access(request, self.task.id), task)
+        self.assertTrue(task.is_member)
+        self.assertFalse(task.is_assignee)
+        self.assertFalse(task.can_edit)
+
+    def test_task_access_for_creator_and_assignee(self):
+        task = get_task_access(self._request(self.user), self.task.id)
+        self.assertTrue(task.is_assignee)
+        self.assertTrue(task.can_edit)
+
+    def test_task_access_for_non_member(self):
+        outsider = User.objects.get(username='@petrapickles')
+        task = get_task_access(self._request(outsider), self.task.id)
+        self.assertFalse(task.is_member)
+
+    def test_task_access_for_missing_task(self):
+        self.assertIsNone(get_task_access(self._request(self.user), self.task.id + 1))
+
+    def test_team_access_is_one_query_and_memoized(self):
+        request = self._request(self.user)
+        with self.assertNumQueries(1):
+            team = get_team_access(request, self.team.team_id)
+            self.assertEqual(team.team_leader, self.user)
+            self.assertIs(get_team_access(request, self.team.team_id), team)
+        self.assertTrue(team.is_member)
+        self.assertIsNone(get_team_access(request, self.team.team_id + 1))
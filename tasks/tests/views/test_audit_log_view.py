@@ -1,8 +1,13 @@
 """Tests of the audit_log view."""
 
-from django.test import TestCase
+from django.db import connection
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from tasks.models import User, Team, Task, AuditLog
+from tasks.audit import AuditLogWriter
+from tasks.views import audit_log_add
 
 class AuditLogViewTestCase(TestCase):
     """Unit tests of the audit_log view."""
@@ -106,8 +111,70 @@ class AuditLogViewTestCase(TestCase):
         self.assertEqual(len(response.context['logs']), 20)
         self.assertNotIn(self.log, response.context['logs'])
 
-    
-
-
-    
-        
\ No newline at end of file
+    @override_settings(AUDIT_LOG_RETENTION=5)
+    def test_log_keeps_configured_number_of_newest_entries(self):
+        self.client.login(username=self.user.username, password='Password123')
+        for i in range(8):
+            self.client.post(reverse('create_task', kwargs={'team_id': self.team.team_id}), {
+                'title' : f'Task {i}',
+                'description' : 'This is a test task',
+                'assigned_to' : [self.user.id],
+                'priority' : 'low'
+            })
+        logs = AuditLog.objects.filter(team=self.team)
+        self.assertEqual(logs.count(), 5)
+        self.assertEqual(sorted(log.task_title for log in logs), [f'Task {i}' for i in range(3, 8)])
+
+    def test_log_write_query_count_does_not_grow_with_log_size(self):
+        with CaptureQueriesContext(connection) as small_log:
+            audit_log_add(None, self.team.team_id, 'Test task', self.user, 'created')
+        for i in range(30):
+            audit_log_add(None, self.team.team_id, 'Test task', self.user, 'created')
+        with CaptureQueriesContext(connection) as full_log:
+            audit_log_add(None, self.team.team_id, 'Test task', self.user, 'created')
+        self.assertEqual(len(small_log), len(full_log))
+        self.assertEqual(AuditLog.objects.filter(team=self.team).count(), 20)
+
+    @override_settings(AUDIT_LOG_BUFFERED=True)
+    def test_buffered_log_is_written_after_commit_and_flush(self):
+        self.client.login(username=self.user.username, password='Password123')
+        writer = AuditLogWriter(batch_size=10, background=False)
+        with patch('tasks.audit._writer', writer):
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.client.post(reverse('create_task', kwargs={'team_id': self.team.team_id}), {
+                    'title' : 'Buffered task',
+                    'description' : 'This is a test task',
+                    'assigned_to' : [self.user.id],
+                })
+            self.assertFalse(AuditLog.objects.filter(task_title='Buffered task').exists())
+            for callback in callbacks:
+                callback()
+            self.assertFalse(AuditLog.objects.filter(task_title='Buffered task').exists())
+            writer.stop()
+        self.assertTrue(AuditLog.objects.filter(task_title='Buffered task', action='created').exists())
+
+    def test_buffered_writer_flushes_in_batches_and_keeps_retention(self):
+        writer = AuditLogWriter(batch_size=7, background=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(25):
+                writer.add(AuditLog(username=self.user, team=self.team, task_title=f'Log {i}', action='created'))
+        with CaptureQueriesContext(connection) as queries:
+            writer.flush()
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('INSERT')]), 4)
+        self.assertEqual(AuditLog.objects.filter(team=self.team).count(), 20)
+        self.assertTrue(AuditLog.objects.filter(task_title='Log 24').exists())
+
+    def test_buffered_entries_of_deleted_team_or_user_are_dropped(self):
+        other_team = Team.objects.create(team_name='Other team', team_leader=self.second_user)
+        deleted_user = User.objects.create_user('@deleted', email='deleted@example.org', first_name='Deleted', last_name='User')
+        writer = AuditLogWriter(batch_size=10, background=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            writer.add(AuditLog(username=self.user, team=self.team, task_title='Kept', action='created'))
+            writer.add(AuditLog(username=self.user, team=other_team, task_title='Deleted team', action='created'))
+            writer.add(AuditLog(username=deleted_user, team=self.team, task_title='Deleted user', action='created'))
+        # Deleted elsewhere, as delete_team does, while the entries wait to be flushed
+        Team.objects.filter(team_id=other_team.team_id).delete()
+        User.objects.filter(id=deleted_user.id).delete()
+        writer.flush()
+        self.assertTrue(AuditLog.objects.filter(task_title='Kept').exists())
+        self.assertFalse(AuditLog.objects.filter(task_title__startswith='Deleted').exists())
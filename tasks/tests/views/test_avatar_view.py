@@ -0,0 +1,94 @@
+"""Tests of the identicon avatar view."""
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from tasks.avatars import identicon_path, render_identicon
+from tasks.models import User, hash_email
+
+class AvatarViewTestCase(TestCase):
+    """Tests of the identicon avatar view."""
+
+    fixtures = ['tasks/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        override = override_settings(AVATAR_CACHE_DIR = self.cache_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        # Fixtures are loaded without saving, so the user's email hash is stored here
+        user = User.objects.get(username='@johndoe')
+        user.save()
+        self.email_hash = user.email_hash
+        self.url = reverse('avatar', kwargs={'email_hash': self.email_hash, 'size': 60})
+
+    def test_avatar_url(self):
+        self.assertEqual(self.url, f'/avatar/{self.email_hash}/60.png')
+
+    def test_get_avatar(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response.content, render_identicon(self.email_hash, 60))
+
+    def test_avatar_is_a_valid_png_of_the_requested_size(self):
+        data = self.client.get(self.url).content
+        self.assertEqual(data[:8], b'\x89PNG\r\n\x1a\n')
+        width, height = struct.unpack('>II', data[16:24])
+        self.assertEqual((width, height), (60, 60))
+        idat_length = struct.unpack('>I', data[33:37])[0]
+        pixels = zlib.decompress(data[41:41 + idat_length])
+        self.assertEqual(len(pixels), 60 * (1 + 60 * 3))
+
+    def test_avatar_is_deterministic(self):
+        self.assertEqual(render_identicon(self.email_hash, 60), render_identicon(self.email_hash, 60))
+        self.assertNotEqual(render_identicon(self.email_hash, 60), render_identicon('0' * 32, 60))
+
+    def test_avatar_is_cached_on_disk(self):
+        path = identicon_path(self.email_hash, 60)
+        self.assertFalse(os.path.exists(path))
+        self.client.get(self.url)
+        self.assertTrue(os.path.exists(path))
+        with open(path, 'wb') as image:
+            image.write(b'cached')
+        response = self.client.get(self.url)
+        self.assertEqual(response.content, b'cached')
+
+    def test_avatar_does_not_need_login(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_cached_avatar_needs_no_queries(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_avatar_of_unknown_hash_is_not_cached(self):
+        email_hash = hash_email('nobody@example.org')
+        response = self.client.get(reverse('avatar', kwargs={'email_hash': email_hash, 'size': 60}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, render_identicon(email_hash, 60))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_avatar_of_unused_size_is_not_cached(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('avatar', kwargs={'email_hash': self.email_hash, 'size': 64}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, render_identicon(self.email_hash, 64))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_unsupported_sizes_are_not_found(self):
+        for size in (0, 15, 513, 100000):
+            url = reverse('avatar', kwargs={'email_hash': self.email_hash, 'size': size})
+            self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_post_is_not_allowed(self):
+        self.assertEqual(self.client.post(self.url).status_code, 405)
@@ -1,7 +1,11 @@
 """Tests of the dashboard view."""
 
-from django.test import TestCase
+from django.db import connection
+import tempfile
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from tasks.caching import bump_dashboard_version, dashboard_panel_stats
 from tasks.models import User, Team, Task, Invites
 
 class DashboardPageViewTestCase(TestCase):
@@ -82,4 +86,53 @@ class DashboardPageViewTestCase(TestCase):
         self.assertIn('tasks', response.context)
         self.assertIn(self.task, response.context['tasks'])
 
-    
\ No newline at end of file
+    def test_invite_list_query_count_does_not_grow_with_invites(self):
+        self.client.login(username=self.second_user.username, password='Password123')
+        with CaptureQueriesContext(connection) as one_invite:
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Test team has invited you')
+        for i in range(5):
+            team = Team.objects.create(team_name=f'Other team {i}', team_leader=self.user)
+            Invites.objects.create(username=self.second_user, team=team)
+        bump_dashboard_version(self.second_user.pk)
+        with CaptureQueriesContext(connection) as many_invites:
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Other team 4 has invited you')
+        self.assertEqual(len(one_invite), len(many_invites))
+
+    def test_panels_are_cached_until_invites_change(self):
+        self.client.login(username=self.second_user.username, password='Password123')
+        stats = dashboard_panel_stats()
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as cached:
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Test team has invited you')
+        self.assertFalse(any('tasks_invites' in query['sql'] for query in cached))
+        self.assertEqual(dashboard_panel_stats()['hits'], stats['hits'] + 1)
+        self.assertEqual(dashboard_panel_stats()['misses'], stats['misses'] + 1)
+
+        self.client.post(reverse('decline_team', kwargs={'team_id': self.team.team_id}))
+        response = self.client.get(self.url)
+        self.assertNotContains(response, 'Test team has invited you')
+        self.assertEqual(dashboard_panel_stats()['misses'], stats['misses'] + 2)
+
+    def test_panels_are_cached_with_file_based_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            file_cache = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir}}
+            with override_settings(CACHES=file_cache):
+                self.client.login(username=self.second_user.username, password='Password123')
+                self.client.get(self.url)
+                response = self.client.get(self.url)
+                self.assertContains(response, 'Test team has invited you')
+                self.assertEqual(dashboard_panel_stats(), {'hits': 1, 'misses': 1})
+
+    def test_unchanged_dashboard_is_not_modified_until_invites_change(self):
+        self.client.login(username=self.second_user.username, password='Password123')
+        self.client.get(self.url)
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.client.post(reverse('join_team', kwargs={'team_id': self.team.team_id}))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,98 @@
+"""Tests of the generated image variants, their template tags and the view serving them."""
+import json
+import os
+import shutil
+import tempfile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from io import StringIO
+
+ICON = 'images/task_manager_icon_largest.png'
+
+class ImageVariantTestCase(TestCase):
+    """Tests of the generated image variants, their template tags and the view serving them."""
+
+    def setUp(self):
+        self.variants_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.variants_dir)
+        override = override_settings(
+            IMAGE_VARIANTS_DIR = self.variants_dir,
+            IMAGE_VARIANTS = {ICON: [50, 100], 'images/missing.png': [10]},
+            IMAGE_VARIANT_FORMATS = ['webp'],
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _build(self):
+        call_command('build_image_variants', stdout = StringIO())
+        with open(os.path.join(self.variants_dir, 'manifest.json')) as manifest:
+            return json.load(manifest)
+
+    def _render(self, template):
+        return Template('{% load responsive_images %}' + template).render(Context())
+
+    def test_build_writes_each_width_in_each_format(self):
+        manifest = self._build()
+        self.assertEqual(list(manifest), [ICON])
+        entry = manifest[ICON]
+        self.assertEqual(entry['fallback'], 'image/png')
+        self.assertEqual([width for width, _ in entry['variants']['image/webp']], [50, 100])
+        self.assertEqual([width for width, _ in entry['variants']['image/png']], [50, 100])
+        for variants in entry['variants'].values():
+            for _, path in variants:
+                self.assertTrue(os.path.exists(os.path.join(self.variants_dir, path)))
+
+    def test_variants_are_much_smaller_than_the_original(self):
+        manifest = self._build()
+        _, path = manifest[ICON]['variants']['image/png'][0]
+        self.assertLess(os.path.getsize(os.path.join(self.variants_dir, path)), 20000)
+
+    def test_rebuild_removes_stale_variants(self):
+        self._build()
+        with override_settings(IMAGE_VARIANTS = {ICON: [50]}):
+            manifest = self._build()
+        files = {
+            os.path.relpath(os.path.join(directory, name), self.variants_dir)
+            for directory, _, names in os.walk(self.variants_dir) for name in names
+        }
+        expected = {path for variants in manifest[ICON]['variants'].values() for _, path in variants}
+        self.assertEqual(files, expected | {'manifest.json'})
+
+    def test_responsive_image_without_variants(self):
+        html = self._render("{% responsive_image 'images/task_manager_icon_largest.png' alt='Logo' %}")
+        self.assertEqual(html, '<img src="/static/images/task_manager_icon_largest.png" alt="Logo">')
+
+    def test_responsive_image_with_variants(self):
+        manifest = self._build()
+        html = self._render("{% responsive_image 'images/task_manager_icon_largest.png' sizes='50px' alt='Logo' width=50 %}")
+        webp = manifest[ICON]['variants']['image/webp']
+        png = manifest[ICON]['variants']['image/png']
+        self.assertIn(f'<source type="image/webp" srcset="/image_variants/{webp[0][1]} 50w, /image_variants/{webp[1][1]} 100w" sizes="50px">', html)
+        self.assertIn(f'<img src="/image_variants/{png[0][1]}"', html)
+        self.assertIn('alt="Logo" width="50"', html)
+
+    def test_image_url_picks_the_narrowest_wide_enough_variant(self):
+        png = self._build()[ICON]['variants']['image/png']
+        self.assertEqual(self._render(f"{{% image_url '{ICON}' 60 %}}"), f'/image_variants/{png[1][1]}')
+        self.assertEqual(self._render(f"{{% image_url '{ICON}' 500 %}}"), f'/image_variants/{png[1][1]}')
+
+    def test_image_set(self):
+        self.assertEqual(self._render(f"{{% image_set '{ICON}' 50 %}}"), f'image-set(url("/static/{ICON}"))')
+        manifest = self._build()
+        html = self._render(f"{{% image_set '{ICON}' 50 %}}")
+        self.assertIn('type("image/webp")', html)
+        self.assertIn(manifest[ICON]['variants']['image/png'][0][1], html)
+
+    def test_get_image_variant(self):
+        _, path = self._build()[ICON]['variants']['image/webp'][0]
+        response = self.client.get(reverse('image_variant', kwargs={'path': path}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_manifest_and_missing_files_are_not_served(self):
+        self._build()
+        self.assertEqual(self.client.get(reverse('image_variant', kwargs={'path': 'manifest.json'})).status_code, 404)
+        self.assertEqual(self.client.get(reverse('image_variant', kwargs={'path': 'images/nope.png'})).status_code, 404)
@@ -0,0 +1,86 @@
+"""Tests of the metrics view and the middleware recording the metrics."""
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client.parser import text_string_to_metric_families
+from tasks.models import Team, User
+from tasks.views import audit_log_add
+
+@override_settings(METRICS_ENABLED = True)
+class MetricsViewTestCase(TestCase):
+    """Tests of the metrics view and the middleware recording the metrics."""
+
+    fixtures = [
+        'tasks/tests/fixtures/default_user.json',
+        'tasks/tests/fixtures/other_users.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username = '@johndoe')
+        self.other_user = User.objects.get(username = '@janedoe')
+        self.url = reverse('metrics')
+
+    def _samples(self, response = None):
+        """Return {(sample name, labels): value} of the metrics served."""
+
+        response = response or self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return {
+            (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for family in text_string_to_metric_families(response.content.decode())
+            for sample in family.samples
+        }
+
+    def test_metrics_url(self):
+        self.assertEqual(self.url, '/metrics/')
+
+    def test_requests_are_counted_by_view_and_status(self):
+        before = self._samples()
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard'))
+        self.client.get(reverse('home'))
+        after = self._samples()
+        dashboard = ('task_manager_requests_total', (('status', '200'), ('view', 'dashboard')))
+        home = ('task_manager_requests_total', (('status', '302'), ('view', 'home')))
+        self.assertEqual(after[dashboard] - before.get(dashboard, 0), 1)
+        self.assertEqual(after[home] - before.get(home, 0), 1)
+        count = ('task_manager_request_duration_seconds_count', (('view', 'dashboard'),))
+        self.assertEqual(after[count] - before.get(count, 0), 1)
+        queries = ('task_manager_request_queries_sum', (('view', 'dashboard'),))
+        self.assertGreater(after[queries] - before.get(queries, 0), 0)
+
+    def test_cache_lookups_are_counted(self):
+        before = self._samples()
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard'))
+        self.client.get(reverse('dashboard'))
+        after = self._samples()
+        for result in ['hit', 'miss']:
+            sample = ('task_manager_cache_lookups_total', (('result', result),))
+            self.assertGreater(after[sample] - before.get(sample, 0), 0)
+
+    def test_audit_log_writes_are_counted(self):
+        team = Team.objects.create(team_leader = self.user, team_name = 'Team', team_description = '')
+        before = self._samples().get(('task_manager_audit_log_writes_total', ()), 0)
+        audit_log_add(None, team.team_id, 'Task', self.user, 'created')
+        after = self._samples()[('task_manager_audit_log_writes_total', ())]
+        self.assertEqual(after - before, 1)
+
+    def test_gauges_of_sessions_and_rows(self):
+        self.client.force_login(self.user)
+        samples = self._samples()
+        self.assertEqual(samples[('task_manager_active_sessions', ())], 1)
+        self.assertEqual(samples[('task_manager_model_rows', (('model', 'User'),))], User.objects.count())
+        self.assertEqual(samples[('task_manager_model_rows', (('model', 'Task'),))], 0)
+
+    @override_settings(METRICS_ALLOWED_IPS = [])
+    def test_metrics_are_only_served_to_staff_elsewhere(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(self.other_user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.other_user.is_staff = True
+        self.other_user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(METRICS_ENABLED = False)
+    def test_metrics_not_found_when_disabled(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
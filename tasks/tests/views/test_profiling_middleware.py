@@ -0,0 +1,73 @@
+"""Tests of the profiling middleware."""
+import json
+import re
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from tasks.models import User
+
+SERVER_TIMING = re.compile(
+    r'^total;dur=(?P<total>[0-9.]+), sql;dur=(?P<sql>[0-9.]+);desc="(?P<queries>[0-9]+) queries", '
+    r'template;dur=(?P<template>[0-9.]+), cache;desc="(?P<hits>[0-9]+) hits, (?P<misses>[0-9]+) misses"$'
+)
+
+@override_settings(PROFILING = True)
+class ProfilingMiddlewareTestCase(TestCase):
+    """Tests of the profiling middleware."""
+
+    fixtures = ['tasks/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username = '@johndoe')
+        self.client.force_login(self.user)
+
+    def _timings(self, response):
+        match = SERVER_TIMING.match(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        return {name: float(value) for name, value in match.groupdict().items()}
+
+    def test_server_timing_counts_queries_and_templates(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'))
+        timings = self._timings(response)
+        self.assertEqual(timings['queries'], len(queries))
+        self.assertGreater(timings['template'], 0)
+        self.assertLessEqual(timings['template'], timings['total'])
+        self.assertLessEqual(timings['sql'], timings['total'])
+
+    def test_server_timing_counts_cache_hits_and_misses(self):
+        first = self._timings(self.client.get(reverse('dashboard')))
+        second = self._timings(self.client.get(reverse('dashboard')))
+        # The dashboard panels are rendered on the first visit and reused on the second
+        self.assertGreater(first['misses'], 0)
+        self.assertGreater(second['hits'], first['hits'])
+        self.assertLess(second['misses'], first['misses'])
+
+    def test_redirect_renders_no_template(self):
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self._timings(response)['template'], 0)
+
+    @override_settings(PROFILING_LOG = True)
+    def test_profile_is_logged_as_json(self):
+        with self.assertLogs('tasks.profiling', 'INFO') as logs:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(logs.records), 1)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['view'], 'dashboard')
+        self.assertEqual(line['status'], 200)
+        self.assertEqual(line['path'], reverse('dashboard'))
+        self.assertEqual(line['queries'], self._timings(response)['queries'])
+        self.assertGreater(line['template_ms'], 0)
+
+    def test_profile_is_not_logged_by_default(self):
+        with self.assertNoLogs('tasks.profiling', 'INFO'):
+            self.client.get(reverse('dashboard'))
+
+    @override_settings(PROFILING = False)
+    def test_no_header_when_disabled(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertNotIn('Server-Timing', response)
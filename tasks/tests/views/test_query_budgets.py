@@ -0,0 +1,210 @@
+"""Query budgets of the views at growing data sizes.
+
+Every view must run the same number of queries whatever the number of
+tasks, members, teams, invites and audit logs, so a view that starts
+running a query per row fails here with the queries it ran.
+"""
+from datetime import date, timedelta
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from tasks.models import AuditLog, Invites, Task, Team, User, hash_email
+from tasks.search import fts_available
+
+# Number of queries each request may run, including the session and user lookups
+QUERY_BUDGETS = {
+    'dashboard': 7,
+    'team_page': 8,
+    'team_page?assigned_to': 8,
+    'task_search?order_by=due_date': 5,
+    'task_search?order_by=title': 5,
+    'task_search?order_by=priority': 5,
+    'task_search?order_by=relevance': 5,
+    'task_search?team&completed': 5,
+    'view_task': 5,
+    'edit_task': 5,
+    'edit_task POST': 18,
+    'update_task_completion POST': 11,
+    'create_task': 4,
+    'create_task POST': 14,
+    'delete_task POST': 12,
+    'audit_log': 4,
+    'add_members': 2,
+    'add_members POST': 10,
+    'team_creation': 2,
+    'team_creation POST': 5,
+    'remove_member': 13,
+    'leave_team': 12,
+    'delete_team': 17,
+    'join_team': 7,
+    'decline_team': 5,
+    'profile': 2,
+    'password': 2,
+}
+
+
+class QueryBudgetTests:
+    """Tests that each view stays within its query budget with SIZE tasks, members, teams, invites and audit logs."""
+
+    SIZE = None
+
+    @classmethod
+    def setUpTestData(cls):
+        size = cls.SIZE
+        cls.user = User.objects.create_user('@johndoe', email='john.doe@example.org', password='Password123', first_name='John', last_name='Doe')
+        cls.outsider = User.objects.create_user('@outsider', email='outsider@example.org', first_name='Out', last_name='Sider')
+        members = User.objects.bulk_create(
+            User(username=f'@member{i}', email=f'member{i}@example.org', email_hash=hash_email(f'member{i}@example.org'), first_name='Member', last_name=f'Number{i}')
+            for i in range(size)
+        )
+        cls.member = members[0]
+
+        cls.team = Team.objects.create(team_leader=cls.user, team_name='Budget', team_description='The team being measured')
+        other_teams = Team.objects.bulk_create(Team(team_leader=member, team_name=f'Other {i}', team_description='') for i, member in enumerate(members))
+        invite_teams = Team.objects.bulk_create(Team(team_leader=member, team_name=f'Invite {i}', team_description='') for i, member in enumerate(members))
+        cls.invite_team = invite_teams[0]
+        Team.team_members.through.objects.bulk_create(
+            [Team.team_members.through(team=cls.team, user=user) for user in [cls.user, *members]]
+            + [Team.team_members.through(team=team, user=user) for team in other_teams for user in [team.team_leader, cls.user]]
+            + [Team.team_members.through(team=team, user=team.team_leader) for team in invite_teams]
+        )
+        Invites.objects.bulk_create(Invites(username=cls.user, team=team) for team in invite_teams)
+
+        today = date.today()
+        tasks = Task.objects.bulk_create(
+            Task(
+                title=f'Report {i}', description='Write the report', created_by=cls.user if i % 2 else member, related_to_team=cls.team,
+                due_date=today + timedelta(days=i % 30) if i % 3 else None, priority=Task.PRIORITY_CHOICES[i % 4][0], completed=i % 5 == 0,
+            )
+            for i, member in enumerate(members)
+        )
+        cls.task = tasks[1]
+        # Tasks only the member works on, which are deleted when they leave the team
+        handovers = Task.objects.bulk_create(
+            Task(title=f'Handover {i}', description='Hand the work over', created_by=cls.member, related_to_team=cls.team)
+            for i in range(size)
+        )
+        Task.assigned_to.through.objects.bulk_create(
+            [Task.assigned_to.through(task=task, user=user) for task, member in zip(tasks, members) for user in [cls.user, member]]
+            + [Task.assigned_to.through(task=task, user=cls.member) for task in handovers]
+        )
+        AuditLog.objects.bulk_create(AuditLog(username=cls.user, team=cls.team, task_title=f'Report {i}', action='created') for i in range(size))
+
+    def setUp(self):
+        # The dashboard panels are cached, which would make the first request to them run more queries
+        cache.clear()
+        # Whether the search index exists is looked up once per process, by whichever test searches first
+        fts_available()
+        self.client.force_login(self.user)
+
+    def assert_budget(self, view, method, url, data=None):
+        with self.assertNumQueries(QUERY_BUDGETS[view]):
+            response = getattr(self.client, method)(url, data or {})
+        self.assertLess(response.status_code, 400)
+        return response
+
+    def get_task_data(self):
+        return {
+            'title': 'Edited report', 'description': 'Write it again', 'due_date': date.today().isoformat(),
+            'priority': 'high', 'assigned_to': [self.user.id, self.member.id],
+        }
+
+    def test_dashboard(self):
+        self.assert_budget('dashboard', 'get', reverse('dashboard'))
+
+    def test_team_page(self):
+        self.assert_budget('team_page', 'get', reverse('team_page', args=[self.team.team_id]))
+
+    def test_team_page_assigned_to(self):
+        self.assert_budget('team_page?assigned_to', 'get', reverse('team_page', args=[self.team.team_id]), {'assigned_to': self.member.username})
+
+    def test_task_search(self):
+        for order_by in ['due_date', 'title', 'priority', 'relevance']:
+            with self.subTest(order_by=order_by):
+                self.assert_budget(f'task_search?order_by={order_by}', 'get', reverse('task_search'), {'order_by': order_by, 'q': 'report'})
+
+    def test_task_search_by_team(self):
+        self.assert_budget('task_search?team&completed', 'get', reverse('task_search'), {'team': self.team.team_id, 'completed': 'on'})
+
+    def test_view_task(self):
+        self.assert_budget('view_task', 'get', reverse('view_task', args=[self.task.id]))
+
+    def test_edit_task(self):
+        self.assert_budget('edit_task', 'get', reverse('edit_task', args=[self.task.id]))
+
+    def test_edit_task_post(self):
+        response = self.assert_budget('edit_task POST', 'post', reverse('edit_task', args=[self.task.id]), self.get_task_data())
+        self.assertEqual(response.status_code, 302)
+
+    def test_update_task_completion_post(self):
+        self.assert_budget('update_task_completion POST', 'post', reverse('update_task_completion', args=[self.task.id]), {'completed': 'on'})
+
+    def test_create_task(self):
+        self.assert_budget('create_task', 'get', reverse('create_task', args=[self.team.team_id]))
+
+    def test_create_task_post(self):
+        response = self.assert_budget('create_task POST', 'post', reverse('create_task', args=[self.team.team_id]), self.get_task_data())
+        self.assertEqual(response.status_code, 302)
+
+    def test_delete_task_post(self):
+        self.assert_budget('delete_task POST', 'post', reverse('delete_task', args=[self.task.id]))
+        self.assertFalse(Task.objects.filter(id=self.task.id).exists())
+
+    def test_audit_log(self):
+        self.assert_budget('audit_log', 'get', reverse('audit_log', args=[self.team.team_id]))
+
+    def test_add_members(self):
+        self.assert_budget('add_members', 'get', reverse('add_members', args=[self.team.team_id]))
+
+    def test_add_members_post(self):
+        response = self.assert_budget('add_members POST', 'post', reverse('add_members', args=[self.team.team_id]), {'usernames': self.outsider.username})
+        self.assertEqual(response.status_code, 302)
+
+    def test_team_creation(self):
+        self.assert_budget('team_creation', 'get', reverse('team_creation'))
+
+    def test_team_creation_post(self):
+        self.assert_budget('team_creation POST', 'post', reverse('team_creation'), {'team_name': 'New', 'team_description': 'Another team'})
+
+    def assert_member_removed(self):
+        self.assertFalse(self.team.team_members.filter(id=self.member.id).exists())
+        self.assertFalse(Task.objects.filter(assigned_to=self.member).exists())
+        self.assertFalse(Task.objects.filter(title__startswith='Handover').exists())
+        self.assertEqual(Task.objects.filter(related_to_team=self.team).count(), self.SIZE)
+
+    def test_remove_member(self):
+        self.assert_budget('remove_member', 'get', reverse('remove_member', args=[self.team.team_id, self.member.username]))
+        self.assert_member_removed()
+
+    def test_leave_team(self):
+        self.client.force_login(self.member)
+        self.assert_budget('leave_team', 'get', reverse('leave_team', args=[self.team.team_id]))
+        self.assert_member_removed()
+
+    def test_delete_team(self):
+        self.assert_budget('delete_team', 'get', reverse('delete_team', args=[self.team.team_id]))
+        self.assertFalse(Team.objects.filter(team_id=self.team.team_id).exists())
+
+    def test_join_team(self):
+        self.assert_budget('join_team', 'get', reverse('join_team', args=[self.invite_team.team_id]))
+
+    def test_decline_team(self):
+        self.assert_budget('decline_team', 'get', reverse('decline_team', args=[self.invite_team.team_id]))
+
+    def test_profile(self):
+        self.assert_budget('profile', 'get', reverse('profile'))
+
+    def test_password(self):
+        self.assert_budget('password', 'get', reverse('password'))
+
+
+class SmallQueryBudgetTestCase(QueryBudgetTests, TestCase):
+    SIZE = 10
+
+
+class MediumQueryBudgetTestCase(QueryBudgetTests, TestCase):
+    SIZE = 100
+
+
+class LargeQueryBudgetTestCase(QueryBudgetTests, TestCase):
+    SIZE = 1000
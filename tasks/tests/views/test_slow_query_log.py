@@ -0,0 +1,55 @@
+"""Tests of the slow query log middleware."""
+import json
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from tasks.models import Task, Team, User
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS = 0)
+class SlowQueryLogTestCase(TestCase):
+    """Tests of the slow query log middleware."""
+
+    fixtures = ['tasks/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username = '@johndoe')
+        self.team = Team.objects.create(team_leader = self.user, team_name = 'Team', team_description = '')
+        self.team.team_members.set([self.user])
+        task = Task.objects.create(title = 'Slow report', description = '', created_by = self.user, related_to_team = self.team)
+        task.assigned_to.set([self.user])
+        self.client.force_login(self.user)
+
+    def _entries(self, url, data = None):
+        with self.assertLogs('tasks.slow_queries', 'WARNING') as logs:
+            self.client.get(url, data)
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_entries_name_the_view_and_the_code_that_ran_the_query(self):
+        entries = self._entries(reverse('task_search'), {'q': 'report'})
+        search = next(entry for entry in entries if 'tasks_task_fts' in entry['sql'])
+        self.assertEqual(search['view'], 'task_search')
+        self.assertEqual(search['path'], reverse('task_search'))
+        self.assertGreaterEqual(search['duration_ms'], 0)
+        self.assertIn('"report"*', search['params'])
+        self.assertTrue(search['stack'][-1].startswith('tasks/'))
+        self.assertTrue(any(line.startswith('tasks/views.py:') and line.endswith(' in task_search') for line in search['stack']))
+        self.assertFalse(any('middleware.py' in line or 'site-packages' in line for line in search['stack']))
+
+    def test_entries_name_the_template_that_ran_the_query(self):
+        entries = self._entries(reverse('task_search'))
+        # The user's teams are only counted when the search form lists them
+        teams = next(entry for entry in entries if 'FROM "tasks_team"' in entry['sql'])
+        self.assertRegex(teams['template'], r'^partials/search_form\.html:[0-9]+$')
+        self.assertTrue(teams['stack'][-1].startswith('tasks/views.py:'))
+        tasks = next(entry for entry in entries if entry['sql'].startswith('SELECT "tasks_task"."id"'))
+        self.assertIsNone(tasks['template'])
+        self.assertTrue(tasks['stack'][-1].startswith('tasks/pagination.py:'))
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS = 60000)
+    def test_fast_queries_are_not_logged(self):
+        with self.assertNoLogs('tasks.slow_queries', 'WARNING'):
+            self.client.get(reverse('dashboard'))
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS = None)
+    def test_nothing_is_logged_when_disabled(self):
+        with self.assertNoLogs('tasks.slow_queries', 'WARNING'):
+            self.client.get(reverse('dashboard'))
@@ -0,0 +1,171 @@
+"""Tests of the asset bundles, their precompression and the middleware serving them."""
+import base64
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+from io import StringIO
+from tasks.assets import brotli, is_vendored, minify_css, rewrite_css_urls
+
+SOURCES = {
+    'vendor/bootstrap/bootstrap.min.css': '/*! Bootstrap */ .btn { color : red; }\n/*# sourceMappingURL=bootstrap.min.css.map */',
+    'vendor/bootstrap-icons/bootstrap-icons.css': '@font-face { src: url("./fonts/bootstrap-icons.woff2?abc") format("woff2"); }',
+    'custom.css': '.logo {\n  width: 50px;\n  height: 50px;\n}\n' * 20,
+}
+
+class StaticAssetsTestCase(TestCase):
+    """Tests of the asset bundles, their precompression and the middleware serving them."""
+
+    def setUp(self):
+        self.source_dir = tempfile.mkdtemp()
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source_dir)
+        self.addCleanup(shutil.rmtree, self.static_root)
+        for name, content in SOURCES.items():
+            os.makedirs(os.path.dirname(os.path.join(self.source_dir, name)), exist_ok = True)
+            with open(os.path.join(self.source_dir, name), 'w') as source:
+                source.write(content)
+
+        override = override_settings(
+            STATICFILES_DIRS = [self.source_dir],
+            STATICFILES_FINDERS = ['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STATIC_ROOT = self.static_root,
+            ASSET_BUNDLES = {
+                'bundles/app.css': list(SOURCES),
+                'bundles/app.js': ['vendor/popper/popper.min.js'],
+            },
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        is_vendored.cache_clear()
+        self.addCleanup(is_vendored.cache_clear)
+
+    def _collectstatic(self):
+        with self.assertLogs('tasks.storage', 'WARNING'):
+            call_command('collectstatic', interactive = False, verbosity = 0, stdout = StringIO())
+        with open(os.path.join(self.static_root, 'bundles.json')) as manifest:
+            return json.load(manifest)
+
+    def _render(self, bundle):
+        return Template("{% load assets %}{% asset_bundle '" + bundle + "' %}").render(Context())
+
+    def test_minify_css(self):
+        self.assertEqual(minify_css('/* comment */\n.a , .b {\n  color: red;\n  margin: 0 auto;\n}\n'), '.a,.b{color: red;margin: 0 auto}')
+
+    def test_rewrite_css_urls(self):
+        css = 'a{background:url(../images/a.png)} b{src:url("fonts/x.woff2?v=1")} c{background:url(data:image/png;base64,AA)}'
+        self.assertEqual(
+            rewrite_css_urls(css, 'vendor/icons/icons.css', 'bundles/app.css'),
+            'a{background:url(../vendor/images/a.png)} b{src:url("../vendor/icons/fonts/x.woff2?v=1")} c{background:url(data:image/png;base64,AA)}'
+        )
+
+    def test_unbuilt_bundle_includes_each_part(self):
+        html = self._render('bundles/app.css')
+        self.assertIn('<link href="/static/vendor/bootstrap/bootstrap.min.css" rel="stylesheet">', html)
+        self.assertIn('<link href="/static/custom.css" rel="stylesheet">', html)
+
+    def test_parts_that_are_not_vendored_come_from_the_cdn(self):
+        html = self._render('bundles/app.js')
+        self.assertEqual(html, (
+            '<script src="https://cdn.jsdelivr.net/npm/@popperjs/core@2.10.2/dist/umd/popper.min.js"'
+            ' integrity="sha384-7+zCNj/IqJ95wo16oMtfsKbZ9ccEh31eOz1HGyDuCQ6wgnyJNSYdrPa03rtR1zdB" crossorigin="anonymous"></script>'
+        ))
+
+    def test_collectstatic_builds_the_bundle(self):
+        bundles = self._collectstatic()
+        self.assertEqual(list(bundles), ['bundles/app.css'])
+        self.assertRegex(bundles['bundles/app.css'], r'^bundles/app\.[0-9a-f]{12}\.css$')
+        with open(os.path.join(self.static_root, bundles['bundles/app.css'])) as bundle:
+            css = bundle.read()
+        self.assertTrue(css.startswith('.btn{color : red}\n@font-face{src: url("../vendor/bootstrap-icons/fonts/bootstrap-icons.woff2?abc") format("woff2")}\n.logo{'))
+        self.assertNotIn('sourceMappingURL', css)
+        self.assertEqual(self._render('bundles/app.css'), f'<link href="/static/{bundles["bundles/app.css"]}" rel="stylesheet">')
+
+    def test_collectstatic_precompresses_text_files(self):
+        bundle = self._collectstatic()['bundles/app.css']
+        for name in ('custom.css', bundle):
+            path = os.path.join(self.static_root, name)
+            with open(path, 'rb') as original, gzip.open(path + '.gz') as compressed:
+                self.assertEqual(compressed.read(), original.read())
+            if brotli is not None:
+                with open(path, 'rb') as original, open(path + '.br', 'rb') as compressed:
+                    self.assertEqual(brotli.decompress(compressed.read()), original.read())
+
+    def test_collectstatic_only_compresses_changed_files(self):
+        self._collectstatic()
+        path = os.path.join(self.static_root, 'custom.css.gz')
+        with open(path, 'wb') as compressed:
+            compressed.write(b'kept')
+        os.utime(path, (os.path.getmtime(path) + 10,) * 2)
+        self._collectstatic()
+        with open(path, 'rb') as compressed:
+            self.assertEqual(compressed.read(), b'kept')
+
+    def test_serve_hashed_file_compressed_and_immutable(self):
+        bundle = self._collectstatic()['bundles/app.css']
+        response = self.client.get(f'/static/{bundle}', HTTP_ACCEPT_ENCODING = 'gzip, deflate, br')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Content-Encoding'], 'br' if brotli is not None else 'gzip')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_serve_gzip(self):
+        self._collectstatic()
+        response = self.client.get('/static/custom.css', HTTP_ACCEPT_ENCODING = 'gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)).decode(), SOURCES['custom.css'])
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+    def test_serve_uncompressed(self):
+        self._collectstatic()
+        response = self.client.get('/static/custom.css')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content).decode(), SOURCES['custom.css'])
+
+    def test_serve_not_modified(self):
+        self._collectstatic()
+        last_modified = self.client.get('/static/custom.css')['Last-Modified']
+        response = self.client.get('/static/custom.css', HTTP_IF_MODIFIED_SINCE = last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_static_files_are_left_to_the_views(self):
+        self._collectstatic()
+        self.assertEqual(self.client.get('/static/missing.css').status_code, 404)
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+
+class VendoredAssetsTestCase(TestCase):
+    """Tests that the third party files are vendored and used instead of the CDN."""
+
+    def setUp(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        override = override_settings(STATIC_ROOT = static_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        is_vendored.cache_clear()
+        self.addCleanup(is_vendored.cache_clear)
+
+    def test_vendored_files_match_their_integrity(self):
+        for path, (url, integrity) in settings.VENDOR_ASSETS.items():
+            with self.subTest(path=path):
+                with open(finders.find(path), 'rb') as vendored:
+                    data = vendored.read()
+                algorithm, expected = integrity.split('-', 1)
+                self.assertEqual(base64.b64encode(hashlib.new(algorithm, data).digest()).decode(), expected)
+
+    def test_base_template_does_not_use_the_cdn(self):
+        html = render_to_string('base.html')
+        self.assertNotIn('cdn.jsdelivr.net', html)
+        self.assertIn('<link href="/static/vendor/bootstrap/bootstrap.min.css" rel="stylesheet">', html)
+        self.assertIn('<script src="/static/vendor/popper/popper.min.js"></script>', html)
+        self.assertIn('<script src="/static/vendor/bootstrap/bootstrap.min.js"></script>', html)
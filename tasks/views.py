@@ -1,20 +1,31 @@
+import hashlib
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.exceptions import ImproperlyConfigured
-from django.http import HttpResponse, HttpResponseRedirect
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from django.db import transaction
+from django.http import Http404, HttpResponse, HttpResponseRedirect
 from django.shortcuts import redirect, render
+from django.utils import timezone
 from django.views import View
+from django.views.decorators.http import condition, require_safe
+from django.views.static import serve
 from django.views.generic.edit import FormView, UpdateView
 from django.urls import reverse
+from prometheus_client import CONTENT_TYPE_LATEST
 from tasks.forms import LogInForm, PasswordForm, UserForm, SignUpForm,TeamCreationForm, InviteForm, TaskForm
-from tasks.helpers import login_prohibited
+from tasks.audit import record_audit_log
+from tasks.avatars import MAX_SIZE as MAX_AVATAR_SIZE, MIN_SIZE as MIN_AVATAR_SIZE, get_identicon
+from tasks.caching import bump_dashboard_version, get_dashboard_version, render_dashboard_panels
+from tasks.helpers import get_task_access, get_team_access, login_prohibited, task_member_required, team_member_required
+from tasks.images import MANIFEST_NAME
+from tasks.metrics import generate_metrics
+from tasks.pagination import keyset_paginate
+from tasks.search import search_tasks
 from .models import Invites,Team, Task, User, AuditLog
-from django.db.models import Q
-from django.template.defaulttags import register
-import copy
+from django.db.models import Case, F, IntegerField, Value, When, prefetch_related_objects
 
 @login_required
 def remove_member(request, team_id, username):
@@ -25,15 +36,10 @@ def remove_member(request, team_id, username):
     else:
         return redirect('dashboard')
     team_member = team.team_members.filter(username = username)
-    tasks = Task.objects.filter(related_to_team = team, assigned_to = user)
     if team_member and user != team.team_leader and request.user == team.team_leader:
-        team.team_members.remove(user)
-        if tasks:
-            for task in tasks:
-                task.assigned_to.remove(user)
-                if task.assigned_to.count() == 0:
-                    # If last member assigned to task is removed, delete task
-                    task.delete()
+        # Tasks only assigned to the removed member are deleted
+        team.remove_member(user)
+        bump_dashboard_version(user.pk)
         return redirect('team_page', team_id = team_id)
     else:
         return redirect('dashboard')
@@ -45,15 +51,10 @@ def leave_team(request, team_id):
         team = Team.objects.get(team_id = team_id)
     else:
         return redirect('dashboard')
-    if request.user != team.team_leader and request.user in team.team_members.all():
-        tasks = Task.objects.filter(related_to_team = team, assigned_to = request.user)
-        team.team_members.remove(request.user)
-        if tasks:
-            for task in tasks:
-                task.assigned_to.remove(request.user)
-                if task.assigned_to.count() == 0:
-                    # If last member assigned to task leaves, delete task
-                    task.delete()
+    if request.user != team.team_leader and team.team_members.filter(pk = request.user.pk).exists():
+        # Tasks only assigned to the leaving member are deleted
+        team.remove_member(request.user)
+        bump_dashboard_version(request.user.pk)
         return redirect('dashboard')
     else:
         return redirect('dashboard')
@@ -63,11 +64,13 @@ def leave_team(request, team_id):
 def delete_team(request, team_id):
     """Allow Team Leader to delete current team"""
     team = Team.objects.filter(team_id = team_id ,team_leader = request.user)
-    team_task = Team.objects.get(team_id = team_id)
-    for invite in Invites.objects.filter(team_id=team_id):
-        invite.delete()
     if team:
-        team.delete()
+        affected_users = set(team.values_list('team_members', flat = True)) | set(team.values_list('invites__username', flat = True))
+        with transaction.atomic():
+            Team.delete_tasks(team_id)
+            # Deleting the team cascades to its audit logs and invites
+            team.delete()
+        bump_dashboard_version(*(user_id for user_id in affected_users if user_id is not None))
     return redirect('dashboard')
 
 @login_required
@@ -76,6 +79,8 @@ def decline_team(request, team_id):
     invite = Invites.objects.filter(team_id = team_id ,username = request.user)
     if invite:
         invite.delete()
+        Team.bump_revision(team_id)
+        bump_dashboard_version(request.user.pk)
     return redirect('dashboard')
 
 @login_required
@@ -86,51 +91,85 @@ def join_team(request, team_id):
         invite.delete()
         team = Team.objects.get(team_id = team_id)
         team.team_members.add(request.user)
+        Team.bump_revision(team_id)
+        bump_dashboard_version(request.user.pk)
         return redirect('team_page', team_id = team_id)
     else:
         return redirect('dashboard')
 
-@register.filter
-def get_item(dictionary, key):
-    return dictionary.get(key)
+def get_page_etag(request, *revisions):
+    """Return an ETag for a page shown to request.user, or None if the page must be rendered.
+
+    The tag covers the given revisions, the user, the query string, the CSRF
+    secret embedded in the page's forms and today's date, which due-date
+    highlighting depends on.
+    """
+
+    if len(messages.get_messages(request)):
+        # Pending flash messages are shown once, so the page cannot be reused
+        return None
+    parts = [request.user.pk, request.user.username, request.GET.urlencode(), request.META.get('CSRF_COOKIE', ''), timezone.now().date(), *revisions]
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+def team_page_etag(request, team_id):
+    """Return the team page ETag from the team's revision, or None if the team doesn't exist."""
+
+    revision = Team.objects.filter(team_id = team_id).values_list('revision', flat = True).first()
+    if revision is None:
+        return None
+    return get_page_etag(request, team_id, revision)
+
+def dashboard_etag(request):
+    """Return the dashboard ETag from the revisions of the user's teams and their invites version."""
+
+    team_revisions = list(Team.objects.filter(team_members = request.user).order_by('team_id').values_list('team_id', 'revision'))
+    return get_page_etag(request, get_dashboard_version(request.user.pk), team_revisions)
 
 @login_required
+@condition(etag_func = team_page_etag)
 def team_page(request, team_id):
     """Displays selected team page information"""
-    if Team.objects.filter(team_id=team_id).exists():
-        teams = Team.objects.get(team_id=team_id)
-        tasks_from_team = Task.objects.filter(related_to_team = teams)
+    teams = Team.objects.select_related('team_leader').filter(team_id=team_id).first()
+    if teams:
         user = request.user
-        teams_members = []
-        for member in teams.team_members.all():
-            teams_members.append(member)
+        teams_members = list(teams.team_members.all())
+        has_tasks = teams.team_tasks.exists()
 
         tasks_assigned = request.GET.get('assigned_to')
-        tasks_from_team = get_filtered_tasks(request, tasks_assigned, team_id)
+        tasks_from_team, pagination = paginate_tasks(request, get_filtered_tasks(request, tasks_assigned, team_id))
+        tasks_from_team = get_task_cards(tasks_from_team, user)
 
-        return render(request, 'team_page.html', {'teams' : teams, 'tasks' : tasks_from_team, 'user': user, 'teams_members': teams_members})
+        return render(request, 'team_page.html', {'teams' : teams, 'tasks' : tasks_from_team, 'user': user, 'teams_members': teams_members, 'has_tasks': has_tasks, 'pagination': pagination})
     else:
         return redirect('dashboard')
 
+def get_task_cards(tasks, user):
+    """Return tasks with their assignees prefetched and can_edit/can_toggle flags set for user."""
+
+    tasks = list(tasks)
+    prefetch_related_objects(tasks, 'assigned_to')
+    for task in tasks:
+        is_assignee = any(assignee.id == user.id for assignee in task.assigned_to.all())
+        task.can_edit = is_assignee or task.created_by_id == user.id
+        task.can_toggle = task.can_edit
+    return tasks
+
 @login_required
+@condition(etag_func = dashboard_etag)
 def dashboard(request):
     """Display the current user's dashboard."""
     current_user = request.user
-    invite_list = []
-    team_names = {}
     user_teams = Team.objects.filter(team_members__in=[current_user])
     teams = Team.objects.filter(team_id__in=user_teams.values('team_id'))
-    tasks = Task.objects.filter(assigned_to__in=[current_user])
-
-    for invite in Invites.objects.filter(username=current_user):
-        invite_list.append(invite)
+    invites = Invites.objects.filter(username=current_user).select_related('team')
 
-    for invite in invite_list:
-        team_names[invite.team_id] = (Team.objects.get(team_id = invite.team_id)).team_name
+    # The teams and invites panels are only rendered again after the user's teams or invites change
+    dashboard_panels = render_dashboard_panels(request, {'teams': teams, 'invites': invites})
 
     tasks = get_filtered_tasks(request) # Filter tasks if search query is provided
+    tasks, pagination = paginate_tasks(request, tasks)
 
-    return render(request, 'dashboard.html', {'user': current_user, 'team_invites': team_names, 'invites': invite_list, 'teams' : teams, 'tasks' : tasks})
+    return render(request, 'dashboard.html', {'user': current_user, 'invites': invites, 'teams' : teams, 'tasks' : tasks, 'pagination': pagination, 'dashboard_panels': dashboard_panels})
 
 @login_required
 def add_members(request, team_id):
@@ -154,7 +193,7 @@ def team_creation(request):
             team.team_leader = request.user
             team.save()
             team.team_members.set([request.user])
-            team.save
+            bump_dashboard_version(request.user.pk)
             return redirect('add_members', team_id = team.team_id); 
     else:
         form = TeamCreationForm()
@@ -271,6 +310,12 @@ class ProfileUpdateView(LoginRequiredMixin, UpdateView):
         user = self.request.user
         return user
 
+    def form_valid(self, form):
+        """Save the profile and mark the user's teams as changed, since their pages list the user."""
+        response = super().form_valid(form)
+        Team.objects.filter(team_members = self.request.user).update(revision = F('revision') + 1)
+        return response
+
     def get_success_url(self):
         """Return redirect URL after successful update."""
         messages.add_message(self.request, messages.SUCCESS, "Profile updated!")
@@ -293,21 +338,20 @@ class SignUpView(LoginProhibitedMixin, FormView):
         return reverse(settings.REDIRECT_URL_WHEN_LOGGED_IN)
 
 @login_required
+@team_member_required
 def create_task(request, team_id):
     """Handle displaying and processing the task creation form."""
 
-    if not Team.objects.filter(team_id = team_id).exists() or not request.user in Team.objects.get(team_id = team_id).team_members.all():
-        return redirect('dashboard')
     if request.method == 'POST':
         form = TaskForm(team_id, request.POST, request.FILES)
         if form.is_valid():
             task = form.save(commit = False)
             task.created_by = request.user
             assigned_to_user = form.cleaned_data.get('assigned_to')
-            task.related_to_team = Team.objects.get(team_id = team_id)
+            task.related_to_team = get_team_access(request, team_id)
             task.save()
             task.assigned_to.set(assigned_to_user)
-            task.save()
+            Team.bump_revision(team_id)
             audit_log_add(request, team_id, task.title, request.user, 'created')
             return redirect('team_page', team_id = team_id)
     else: 
@@ -315,23 +359,22 @@ def create_task(request, team_id):
     return render(request, 'task.html', {'form' : form, 'team_id' : team_id})
 
 @login_required
+@task_member_required
 def edit_task(request, task_id):
     """Display the task edit page and handle task edits."""
 
-    if not Task.objects.filter(pk = task_id).exists() or not request.user in Task.objects.get(pk = task_id).related_to_team.team_members.all():
-        return redirect('dashboard')
-    task = Task.objects.get(pk = task_id)
+    task = get_task_access(request, task_id)
     team_id = task.related_to_team.team_id
-    if(request.user == task.created_by or request.user in task.assigned_to.all()):
+    if task.can_edit:
         if request.method == 'POST':
-            before_edit = copy.deepcopy(task)
-            before_assigned_to = set(task.assigned_to.all())
+            task.snapshot_assignees()
             form = TaskForm(team_id, request.POST, request.FILES, instance = task)
             if form.is_valid():
+                changes = task.get_changes(form.cleaned_data['assigned_to'])
                 form.save()
-                after_edit = form.instance
-                changes = compare_task_details(before_edit, after_edit, before_assigned_to)
-                audit_log_add(request, team_id, task.title, request.user, 'edited', changes)
+                if changes:
+                    Team.bump_revision(team_id)
+                audit_log_add(request, team_id, task.title, request.user, 'edited', Task.describe_changes(changes))
                 return redirect('team_page', team_id = team_id)
         else: 
             form = TaskForm(team_id, instance = task)
@@ -340,26 +383,25 @@ def edit_task(request, task_id):
         return redirect('team_page', team_id = team_id)
 
 @login_required
+@task_member_required
 def delete_task(request, task_id):
     """Handle deletion of tasks."""
 
-    if not Task.objects.filter(pk = task_id).exists() or not request.user in Task.objects.get(pk = task_id).related_to_team.team_members.all():
-        return redirect('dashboard')
-    task = Task.objects.get(pk = task_id)
+    task = get_task_access(request, task_id)
     team_id = task.related_to_team.team_id
-    if(request.user == task.created_by):
+    if task.created_by_id == request.user.pk:
         audit_log_add(request, team_id, task.title, request.user, 'deleted')
         task.delete()
+        Team.bump_revision(team_id)
     return redirect('team_page', team_id = team_id)
 
 
 @login_required
+@task_member_required
 def view_task(request, task_id):
     """Display the task view page."""
 
-    if not Task.objects.filter(pk = task_id).exists() or not request.user in Task.objects.get(pk = task_id).related_to_team.team_members.all():
-        return redirect('dashboard')
-    task = Task.objects.get(pk = task_id)
+    task = get_task_access(request, task_id)
     return render(request, 'view_task.html', {'task' : task})
 
 @login_required
@@ -367,9 +409,22 @@ def task_search(request):
     """Display the task search page and filter tasks by search."""
     
     user_teams = Team.objects.filter(team_members__in=[request.user])
-    tasks = get_filtered_tasks(request) # Filter tasks if search query is provided
+    tasks = get_filtered_tasks(request).select_related('related_to_team') # Filter tasks if search query is provided
+    tasks, pagination = paginate_tasks(request, tasks)
+
+    return render(request, 'task_search.html', {'tasks': tasks, 'teams' : user_teams, 'pagination': pagination})
+
+# Field each order_by option sorts tasks by
+TASK_SORT_FIELDS = {'due_date': 'due_date', 'title': 'title', 'priority': 'priority_rank', 'relevance': 'search_rank'}
 
-    return render(request, 'task_search.html', {'tasks': tasks, 'teams' : user_teams})
+def get_sort_field(request):
+    """Return the field tasks are sorted by for the request's order_by option."""
+
+    order_by = request.GET.get('order_by', 'due_date')
+    if order_by == 'relevance' and not request.GET.get('q'):
+        # Relevance needs a search query, so order by due date without one
+        order_by = 'due_date'
+    return TASK_SORT_FIELDS.get(order_by, 'id')
 
 def get_filtered_tasks(request, assigned_to = None, team_id = None):
     """Return a list of filtered tasks based on search and order_by."""
@@ -387,12 +442,11 @@ def get_filtered_tasks(request, assigned_to = None, team_id = None):
         tasks = Task.objects.filter(assigned_to__in=[request.user])
 
     if query:
-        # Filter by search query if provided
-        tasks = tasks.filter(Q(title__icontains=query) | Q(description__icontains=query))
+        # Filter by search query if provided, ranking tasks by relevance
+        tasks = search_tasks(tasks, query)
 
     if teams_search:
-        selected_team = Team.objects.get(team_id=teams_search)
-        tasks = tasks.filter(related_to_team=selected_team)
+        tasks = tasks.filter(related_to_team_id=teams_search)
 
     if assigned_to:
         tasks = tasks.filter(assigned_to__username=assigned_to)
@@ -400,107 +454,112 @@ def get_filtered_tasks(request, assigned_to = None, team_id = None):
     if completed_filter:
         tasks = tasks.filter(completed=False)
     
-    # Custom priority order
-    custom_priority_order = {'': 3, 'low': 2, 'medium': 1, 'high': 0}
-
     if order_by == 'priority':
-        # Order tasks using custom priority key
-        tasks = sorted(tasks, key=lambda task: custom_priority_order.get(task.priority, 0))
-    elif order_by == 'due_date':
-        tasks = tasks.order_by('due_date')
-    elif order_by == 'title':
-        tasks = tasks.order_by('title')
+        # Order tasks by their priority rank in the database
+        tasks = tasks.annotate(priority_rank=priority_rank())
+
+    # Tasks without a value come first, and ties are broken by id so pages are stable
+    sort_field = get_sort_field(request)
+    tasks = tasks.order_by(F(sort_field).asc(nulls_first=True), 'id')
 
     return tasks
 
+def paginate_tasks(request, tasks):
+    """Return the page of filtered tasks after the request's cursor and the query strings of the first and next pages."""
+
+    sort_field = get_sort_field(request)
+    page, next_cursor = keyset_paginate(tasks, sort_field, request.GET.get('cursor'), settings.TASKS_PAGE_SIZE)
+
+    # Keep the current search, filters and ordering when changing page
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    pagination = {'first': params.urlencode() if 'cursor' in request.GET else None, 'next': None}
+    if next_cursor:
+        params['cursor'] = next_cursor
+        pagination['next'] = params.urlencode()
+    return page, pagination
+
+def priority_rank():
+    """Return an expression mapping a task's priority to its rank in Task.PRIORITY_RANKS."""
+
+    whens = [When(priority=priority, then=Value(rank)) for priority, rank in Task.PRIORITY_RANKS.items()]
+    return Case(*whens, default=Value(len(Task.PRIORITY_RANKS)), output_field=IntegerField())
+
 @login_required
+@team_member_required
 def audit_log(request, team_id):
     """Display the audit log page."""
-    team = Team.objects.get(team_id = team_id)
+    team = get_team_access(request, team_id)
 
-    if request.user not in team.team_members.all():
-        return redirect('dashboard')
-
-    if not request.user == team.team_leader:
+    if not request.user.pk == team.team_leader_id:
         return redirect('team_page', team_id = team_id)
     else:
-        logs = AuditLog.objects.filter(team_id = team_id)
+        logs = AuditLog.objects.filter(team_id = team_id).select_related('username')
         return render(request, 'audit_log.html', {'logs' : logs})
 
 def audit_log_add(request, team_id, task, username, action, changes = None):
-    """Add an audit log entry."""
-
-    team = Team.objects.get(team_id = team_id)
-
-    if(AuditLog.objects.filter(team_id = team_id).count() > 19 and (changes or action != 'edited')):
-        # If there are more than 20 logs, delete the oldest one
-        AuditLog.objects.filter(team_id = team_id).order_by('timestamp').first().delete()
+    """Add an audit log entry, keeping only the team's newest AUDIT_LOG_RETENTION entries."""
 
     if action == 'edited' and not changes:
         return
 
-    AuditLog.objects.create(
+    record_audit_log(AuditLog(
         username = username, 
-        team = team,
+        team_id = team_id,
         task_title = task, 
         action = action,
         changes = changes
-    )
-
-def compare_task_details(before_edit, after_edit, assigned):
-    """Find changes made during task edits."""
-
-    changes = []
-    for field, display_name in [('title', 'Title'), ('description', 'Description'), ('due_date', 'Due date'), ('priority', 'Priority'), ('assigned_to', 'Assigned to'), ('completed', 'Completed')]:
-        value_before = getattr(before_edit, field)
-        value_after = getattr(after_edit, field)
-
-        if field == 'assigned_to':
-            before_users = set(assigned)
-            after_users = set(value_after.all())
-
-            added_users = after_users - before_users
-            removed_users = before_users - after_users
-            if not before_users == after_users:
-                added_string = ""
-                if added_users:
-                    added_usernames = ', '.join(user.username for user in added_users)
-                    added_string += (f"Added {added_usernames} ")
-
-                if removed_users:
-                    removed_usernames = ', '.join(user.username for user in removed_users)
-                    added_string += (f"Removed {removed_usernames} ")
-                changes.append(f"{display_name}: {added_string}")
-                continue
-
-        if value_before == "": 
-            value_before = "None"
-
-        if value_after == "":
-            value_after = "None"
-
-        if value_before != value_after:
-            change_string = f"{display_name}: {value_before} to {value_after}"
-            changes.append(change_string)
-
-    return '\n'.join(changes)
+    ))
 
 @login_required
+@task_member_required
 def update_task_completion(request, task_id):
     """Update task completion status."""
 
-    if not Task.objects.filter(pk = task_id).exists() or not request.user in Task.objects.get(pk = task_id).related_to_team.team_members.all():
-        return redirect('dashboard')
-
-    task = Task.objects.get(id=task_id)
-    if request.user == task.created_by or request.user in task.assigned_to.all():
+    task = get_task_access(request, task_id)
+    if task.can_edit:
         if request.method == 'POST':
             completed = request.POST.get('completed') == 'on' 
             task.completed = completed
             task.save()
+            Team.bump_revision(task.related_to_team.team_id)
             audit_log_add(request, task.related_to_team.team_id, task.title, request.user, 'set completed' if completed else 'set uncompleted')
             return redirect('team_page', team_id=task.related_to_team.team_id)
         else:
             return redirect('team_page', team_id=task.related_to_team.team_id)
     else:
-        return redirect('team_page', team_id=task.related_to_team.team_id)
\ No newline at end of file
+        return redirect('team_page', team_id=task.related_to_team.team_id)
+
+
+@require_safe
+def avatar(request, email_hash, size):
+    """Serve the identicon avatar for an email hash, which never changes once rendered."""
+
+    size = int(size)
+    if not MIN_AVATAR_SIZE <= size <= MAX_AVATAR_SIZE:
+        raise Http404('Unsupported avatar size.')
+
+    response = HttpResponse(get_identicon(email_hash, size), content_type = 'image/png')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+@require_safe
+def image_variant(request, path):
+    """Serve a generated image variant, whose name changes whenever its content does."""
+
+    if path == MANIFEST_NAME:
+        raise Http404('Not an image variant.')
+    response = serve(request, path, document_root = settings.IMAGE_VARIANTS_DIR)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@require_safe
+def metrics(request):
+    """Serve the Prometheus metrics to staff and to the addresses in METRICS_ALLOWED_IPS."""
+
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if not (request.user.is_staff or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS):
+        raise PermissionDenied
+    return HttpResponse(generate_metrics(), content_type = CONTENT_TYPE_LATEST)